@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
+from refresh import RefreshScheduler
 
 # Model
 class MedicalCenterModel:
@@ -87,23 +88,15 @@ class MedicalCenterView:
         self.root = root
         self.controller = controller
         self.root.title("Medical Center Management")
-        
+
+        # The controller points these at the model's lists; the tables are painted from them
         self.doctors = []
         self.patients = []
         self.create_doctor_list_view()
         self.create_patient_list_view()
         self.create_assignment_buttons()
         self.create_consultation_buttons()
-        #self.create_info_buttons()
-
-        # Load doctors and patients data from text files
-        self.load_doctors_data()
-        self.load_patients_data()
-        self.assign_button = ttk.Button(self.root, text="Assign")
-        self.assign_button.grid(row=1, column=4, padx=5, pady=5)
-        
-        # Bind the button to the controller's method
-        self.assign_button.config(command=self.assign_patient_to_doctor)
+        self.create_info_buttons()
 
     def create_doctor_list_view(self):
         doctor_frame = ttk.LabelFrame(self.root, text="Doctors")
@@ -115,26 +108,6 @@ class MedicalCenterView:
         self.doctor_list.heading("Specialization", text="Specialization")
         self.doctor_list.pack(fill="both", expand=True)
 
-        # Load doctor data from Doctor.txt
-        doctor_dict = {}
-
-        try:
-            with open('Doctor.txt', 'r') as file:
-                data = file.readlines()
-                for i, j in enumerate(data, start=1000):
-                    doctor_dict[i] = j.strip().split(",")
-
-            ids = list(doctor_dict.keys())
-
-            for i in ids:
-                id = i
-                name = str(doctor_dict[i][0]) + " " + str(doctor_dict[i][1])
-                spec = doctor_dict[i][2]
-
-                self.doctor_list.insert("", "end", values=(id, name, spec))
-        except FileNotFoundError:
-            print("Doctor.txt file not found.")
-
     def create_patient_list_view(self):
         patient_frame = ttk.LabelFrame(self.root, text="Patients")
         patient_frame.grid(row=0, column=1, padx=10, pady=10, sticky='nsew')
@@ -145,29 +118,6 @@ class MedicalCenterView:
         self.patient_list.heading("Assigned Doctor", text="Assigned Doctor")
         self.patient_list.pack(fill="both", expand=True)
 
-        # Load patient data from Patient.txt
-        patient_dict = {}
-
-        try:
-            with open('Patient.txt', 'r') as file:
-                data = file.readlines()
-                for i, j in enumerate(data, start=2000):
-                    patient_dict[i] = j.strip().split(",")
-
-            ids = list(patient_dict.keys())
-
-            for i in ids:
-                id = i
-                name = str(patient_dict[i][0]) + " " + str(patient_dict[i][1])
-
-                self.patient_list.insert("", "end", values=(id, name))
-        except FileNotFoundError:
-            print("Patient.txt file not found.")
-    
-    def assign_patient_to_doctor(self):
-        patient_id = self.view.patient_id_var.get()
-        doctor_id = self.view.doctor_id_var.get()
-
     def create_assignment_buttons(self):
         assignment_frame = ttk.LabelFrame(self.root, text="Assignments")
         assignment_frame.grid(row=1, column=0, columnspan=2, padx=10, pady=10, sticky='nsew')
@@ -181,19 +131,12 @@ class MedicalCenterView:
 
         self.patient_id_entry = ttk.Entry(assignment_frame, textvariable=self.patient_id_var)
         self.doctor_id_entry = ttk.Entry(assignment_frame, textvariable=self.doctor_id_var)
-        self.assign_button = ttk.Button(assignment_frame, text="Assign", command=self.assign_patient_to_doctor)
+        # The controller is set after the view is built, so it is looked up when the button is pressed
+        self.assign_button = ttk.Button(assignment_frame, text="Assign", command=lambda: self.controller.assign_patient_to_doctor())
 
         self.patient_id_entry.grid(row=1, column=1, padx=5, pady=5)
         self.doctor_id_entry.grid(row=1, column=3, padx=5, pady=5)
         self.assign_button.grid(row=1, column=4, padx=5, pady=5)
-        
-    def add_consultation(self):
-        patient_id = self.consultation_patient_id_var.get()
-        doctor_id = self.consultation_doctor_id_var.get()
-        date = self.consultation_date_var.get()
-        description = self.consultation_description_var.get()
-        fee = self.consultation_fee_var.get()
-
 
     def create_consultation_buttons(self):
         consultation_frame = ttk.LabelFrame(self.root, text="Consultations")
@@ -217,7 +160,7 @@ class MedicalCenterView:
         self.consultation_date_entry = ttk.Entry(consultation_frame, textvariable=self.consultation_date_var)
         self.consultation_description_entry = ttk.Entry(consultation_frame, textvariable=self.consultation_description_var)
         self.consultation_fee_entry = ttk.Entry(consultation_frame, textvariable=self.consultation_fee_var)
-        self.add_consultation_button = ttk.Button(consultation_frame, text="Add Consultation", command=self.add_consultation)
+        self.add_consultation_button = ttk.Button(consultation_frame, text="Add Consultation", command=lambda: self.controller.add_consultation())
 
         self.consultation_patient_id_entry.grid(row=1, column=1, padx=5, pady=5)
         self.consultation_doctor_id_entry.grid(row=1, column=3, padx=5, pady=5)
@@ -226,26 +169,25 @@ class MedicalCenterView:
         self.consultation_fee_entry.grid(row=2, column=5, padx=5, pady=5)
         self.add_consultation_button.grid(row=3, column=0, columnspan=6, padx=5, pady=5)
 
-    # def create_info_buttons(self):
-    #     info_frame = ttk.LabelFrame(self.root, text="Information")
-    #     info_frame.grid(row=3, column=0, columnspan=2, padx=10, pady=10, sticky='nsew')
+    def create_info_buttons(self):
+        info_frame = ttk.LabelFrame(self.root, text="Information")
+        info_frame.grid(row=3, column=0, columnspan=2, padx=10, pady=10, sticky='nsew')
 
-    #     ttk.Label(info_frame, text="View Information:").grid(row=0, column=0, padx=5, pady=5)
-    #     ttk.Label(info_frame, text="ID:").grid(row=1, column=0, padx=5, pady=5)
+        ttk.Label(info_frame, text="View Information:").grid(row=0, column=0, padx=5, pady=5)
+        ttk.Label(info_frame, text="ID:").grid(row=1, column=0, padx=5, pady=5)
 
-    #     self.info_id_var = tk.StringVar()
+        self.info_id_var = tk.StringVar()
 
-    #     self.info_id_entry = ttk.Entry(info_frame, textvariable=self.info_id_var)
-    #     self.view_doctor_button = ttk.Button(info_frame, text="View Doctor Info", command=self.view_doctor_info)
-    #     self.view_patient_button = ttk.Button(info_frame, text="View Patient Info", command=self.view_patient_info)
-    #     self.view_consultation_button = ttk.Button(info_frame, text="View Consultation Report", command=self.view_consultation_report)
+        self.info_id_entry = ttk.Entry(info_frame, textvariable=self.info_id_var)
+        self.view_doctor_button = ttk.Button(info_frame, text="View Doctor Info", command=lambda: self.controller.view_doctor_info())
+        self.view_patient_button = ttk.Button(info_frame, text="View Patient Info", command=lambda: self.controller.view_patient_info())
+        self.view_consultation_button = ttk.Button(info_frame, text="View Consultation Report", command=lambda: self.controller.view_consultation_report())
+
+        self.info_id_entry.grid(row=1, column=1, padx=5, pady=5)
+        self.view_doctor_button.grid(row=1, column=2, padx=5, pady=5)
+        self.view_patient_button.grid(row=1, column=3, padx=5, pady=5)
+        self.view_consultation_button.grid(row=1, column=4, padx=5, pady=5)
 
-    #     self.info_id_entry.grid(row=1, column=1, padx=5, pady=5)
-    #     self.view_doctor_button.grid(row=1, column=2, padx=5, pady=5)
-    #     self.view_patient_button.grid(row=1, column=3, padx=5, pady=5)
-    #     self.view_consultation_button.grid(row=1, column=4, padx=5, pady=5)
-        
-        
     def display_info(self, info):
         info_window = tk.Toplevel(self.root)
         info_window.title("Information")
@@ -260,178 +202,117 @@ class MedicalCenterView:
     def update_patient_list(self):
         self.patient_list.delete(*self.patient_list.get_children())
         for patient in self.patients:
-            assigned_doctor = patient.doctor.get_info() if patient.doctor else "No Assigned Doctor"
+            assigned_doctor = f"{patient.doctor.first_name} {patient.doctor.last_name}" if patient.doctor else "No Assigned Doctor"
             self.patient_list.insert('', 'end', values=(patient.patient_id, f"{patient.first_name} {patient.last_name}", assigned_doctor))
 
 
-        # Rest of your view initialization code...
-
-        # Assign the controller's method to the button command
-        self.assign_button.config(command=self.controller.assign_patient_to_doctor)
-
-        # Rest of your view initialization code...
-
 # Controller
-# class MedicalCenterController:
-#     def __init__(self, model, view):
-#         self.model = model
-#         self.view = view
-
-#     def start(self):
-#         self.view.load_doctors_data()
-#         self.view.load_patients_data()
-#         self.view.root.mainloop()
-
 class MedicalCenterController:
     def __init__(self, model, view):
         self.model = model
         self.view = view
+        view.doctors = model.doctors
+        view.patients = model.patients
+        # Both tables are repainted at most once per event-loop tick however many actions run
+        self.refresh = RefreshScheduler(view.root)
+        self.refresh.register("patients", view.update_patient_list)
+        self.refresh.register("doctors", view.update_doctor_list)
+        view.root.protocol("WM_DELETE_WINDOW", self.close)
 
     def start(self):
-        self.view.load_doctors_data()
-        self.view.load_patients_data()
+        self.load_doctors_data()
+        self.load_patients_data()
+        self.refresh.mark_dirty("doctors")
+        self.refresh.mark_dirty("patients")
         self.view.root.mainloop()
 
-    # def assign_patient_to_doctor(self):
-    #     patient_id = self.view.patient_id_var.get()
-    #     doctor_id = self.view.doctor_id_var.get()
+    def close(self):
+        print(f"Table refreshes: {self.refresh.summary()}")
+        self.view.root.destroy()
 
-        try:
-            patient = next(patient for patient in self.model.patients if patient.patient_id == int(patient_id))
-            doctor = next(doctor for doctor in self.model.doctors if doctor.doctor_id == int(doctor_id))
-            patient.assign_doctor(doctor)
-            doctor.assign_patient(patient)
-            self.view.update_patient_list()
-            self.view.update_doctor_list()
-            messagebox.showinfo("Assignment", f"Patient {patient.first_name} {patient.last_name} assigned to Doctor {doctor.first_name} {doctor.last_name}.")
-        except StopIteration:
-            messagebox.showerror("Error", "Patient or doctor not found.")
-
-        
     def load_doctors_data(self):
+        # Load doctor data from Doctor.txt and create Doctor objects in the model
         try:
             with open('Doctor.txt', 'r') as file:
                 data = file.readlines()
                 for i, j in enumerate(data, start=1000):
                     doctor_data = j.strip().split(",")
-                    doctor = Doctor(int(i), *doctor_data)
-                    self.doctors.append(doctor)
+                    self.model.doctors.append(Doctor(int(i), *doctor_data))
         except FileNotFoundError:
             print("Doctor.txt file not found.")
 
-        # Load doctor data from Doctor.txt and create Doctor objects
-        # Append the created Doctor objects to self.doctors
-        #pass
-
     def load_patients_data(self):
+        # Load patient data from Patient.txt and create Patient objects in the model
         try:
             with open('Patient.txt', 'r') as file:
                 data = file.readlines()
                 for i, j in enumerate(data, start=2000):
                     patient_data = j.strip().split(",")
-                    patient = Patient(int(i), *patient_data)
-                    self.patients.append(patient)
+                    self.model.patients.append(Patient(int(i), *patient_data))
         except FileNotFoundError:
             print("Patient.txt file not found.")
-        # Load patient data from Patient.txt and create Patient objects
-        # Append the created Patient objects to self.patients
-        #pass
-    
-        self.load_doctors_data()
-        self.load_patients_data()
-        self.assign_button = ttk.Button(self.root, text="Assign")
-        self.assign_button.grid(row=1, column=4, padx=5, pady=5)
+
+    def find_patient(self, patient_id):
+        return next(patient for patient in self.model.patients if patient.patient_id == int(patient_id))
+
+    def find_doctor(self, doctor_id):
+        return next(doctor for doctor in self.model.doctors if doctor.doctor_id == int(doctor_id))
 
     def assign_patient_to_doctor(self):
-        patient_id = self.patient_id_var.get()
-        doctor_id = self.doctor_id_var.get()
+        patient_id = self.view.patient_id_var.get()
+        doctor_id = self.view.doctor_id_var.get()
 
         try:
-            patient = next(patient for patient in self.patients if patient.patient_id == int(patient_id))
-            doctor = next(doctor for doctor in self.doctors if doctor.doctor_id == int(doctor_id))
+            patient = self.find_patient(patient_id)
+            doctor = self.find_doctor(doctor_id)
             patient.assign_doctor(doctor)
             doctor.assign_patient(patient)
-            self.update_patient_list()
-            self.update_doctor_list()
+            self.refresh.mark_dirty("patients")
+            self.refresh.mark_dirty("doctors")
             messagebox.showinfo("Assignment", f"Patient {patient.first_name} {patient.last_name} assigned to Doctor {doctor.first_name} {doctor.last_name}.")
-        except StopIteration:
+        except (StopIteration, ValueError):
             messagebox.showerror("Error", "Patient or doctor not found.")
-        # Handle assigning a patient to a doctor
-        #pass
 
-    # def add_consultation(self):
-    #     patient_id = self.consultation_patient_id_var.get()
-    #     doctor_id = self.consultation_doctor_id_var.get()
-    #     date = self.consultation_date_var.get()
-    #     description = self.consultation_description_var.get()
-    #     fee = self.consultation_fee_var.get()
+    def add_consultation(self):
+        patient_id = self.view.consultation_patient_id_var.get()
+        doctor_id = self.view.consultation_doctor_id_var.get()
+        date = self.view.consultation_date_var.get()
+        description = self.view.consultation_description_var.get()
+        fee = self.view.consultation_fee_var.get()
 
         try:
-            patient = next(patient for patient in self.patients if patient.patient_id == int(patient_id))
-            doctor = next(doctor for doctor in self.doctors if doctor.doctor_id == int(doctor_id))
+            patient = self.find_patient(patient_id)
+            doctor = self.find_doctor(doctor_id)
             consultation = Consultation(date, description, fee)
             patient.add_consultation(consultation)
             doctor.add_consultation(consultation)
-            self.update_patient_list()
-            self.update_doctor_list()
+            self.refresh.mark_dirty("patients")
+            self.refresh.mark_dirty("doctors")
             messagebox.showinfo("Consultation", f"Consultation added for Patient {patient.first_name} {patient.last_name} with Doctor {doctor.first_name} {doctor.last_name}.")
-        except StopIteration:
+        except (StopIteration, ValueError):
             messagebox.showerror("Error", "Patient or doctor not found.")
-        # Handle adding a consultation
-        #pass
 
     def view_doctor_info(self):
-        doctor_id = self.info_id_var.get()
         try:
-            doctor = next(doctor for doctor in self.doctors if doctor.doctor_id == int(doctor_id))
-            info = doctor.get_info()
-            self.display_info(info)
-        except StopIteration:
+            doctor = self.find_doctor(self.view.info_id_var.get())
+            self.view.display_info(doctor.get_info())
+        except (StopIteration, ValueError):
             messagebox.showerror("Error", "Doctor not found.")
-        # Handle viewing doctor information
-        #pass
 
     def view_patient_info(self):
-        patient_id = self.info_id_var.get()
         try:
-            patient = next(patient for patient in self.patients if patient.patient_id == int(patient_id))
-            info = patient.get_info()
-            self.display_info(info)
-        except StopIteration:
+            patient = self.find_patient(self.view.info_id_var.get())
+            self.view.display_info(patient.get_info())
+        except (StopIteration, ValueError):
             messagebox.showerror("Error", "Patient not found.")
-        # Handle viewing patient information
-        #pass
 
     def view_consultation_report(self):
-        patient_id = self.info_id_var.get()
         try:
-            patient = next(patient for patient in self.patients if patient.patient_id == int(patient_id))
-            consultation_report = patient.get_consultation_report()
-            self.display_info(consultation_report)
-        except StopIteration:
+            patient = self.find_patient(self.view.info_id_var.get())
+            self.view.display_info(patient.get_consultation_report())
+        except (StopIteration, ValueError):
             messagebox.showerror("Error", "Patient not found.")
-        # Handle viewing consultation report
-        pass
-    def create_info_buttons(self):
-        info_frame = ttk.LabelFrame(self.root, text="Information")
-        info_frame.grid(row=3, column=0, columnspan=2, padx=10, pady=10, sticky='nsew')
-
-        ttk.Label(info_frame, text="View Information:").grid(row=0, column=0, padx=5, pady=5)
-        ttk.Label(info_frame, text="ID:").grid(row=1, column=0, padx=5, pady=5)
-
-        self.info_id_var = tk.StringVar()
-
-        self.info_id_entry = ttk.Entry(info_frame, textvariable=self.info_id_var)
-        self.view_doctor_button = ttk.Button(info_frame, text="View Doctor Info", command=self.view_doctor_info)
-        self.view_patient_button = ttk.Button(info_frame, text="View Patient Info", command=self.view_patient_info)
-        self.view_consultation_button = ttk.Button(info_frame, text="View Consultation Report", command=self.view_consultation_report)
 
-        self.info_id_entry.grid(row=1, column=1, padx=5, pady=5)
-        self.view_doctor_button.grid(row=1, column=2, padx=5, pady=5)
-        self.view_patient_button.grid(row=1, column=3, padx=5, pady=5)
-        self.view_consultation_button.grid(row=1, column=4, padx=5, pady=5)
-    
-    # Rest of your controller methods...
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,152 @@
+import gzip
+import json
+import lzma
+import os
+from datetime import date
+
+from model import Consultation
+
+# Retention tiering for old consultations
+# Consultations older than the retention window are moved out of the in-memory
+# lists into compressed JSON Lines segments, one file per month. Each patient and
+# doctor keeps a count of what was archived, and the archive is only read when
+# someone asks for a full history.
+
+ARCHIVE_DIRECTORY = "archive"
+RETENTION_MONTHS = 12
+
+OPENERS = {
+    "gzip": (gzip.open, ".jsonl.gz"),
+    "lzma": (lzma.open, ".jsonl.xz"),
+}
+
+
+def consultation_month(consultation):
+    # Month of an ISO date (YYYY-MM-DD or YYYY-MM); None for dates in any other format
+    text = str(consultation.date).strip()
+    try:
+        year, month = int(text[0:4]), int(text[5:7])
+    except ValueError:
+        return None
+    if text[4:5] != "-" or not 1 <= month <= 12:
+        return None
+    return year, month
+
+
+def cutoff_month(months, today=None):
+    # First month that stays in memory when keeping the last `months` months
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return index // 12, index % 12 + 1
+
+
+class ConsultationArchive:
+    def __init__(self, directory=ARCHIVE_DIRECTORY, compression="gzip"):
+        self.directory = directory
+        self.opener, self.suffix = OPENERS[compression]
+
+    def segment_path(self, year, month):
+        return os.path.join(self.directory, f"consultations-{year:04d}-{month:02d}{self.suffix}")
+
+    def segments(self):
+        # Segment files in month order
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith("consultations-") and name.endswith(self.suffix))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def append(self, records_by_month):
+        # Append records to their month segments; compressed streams can be appended to as new members
+        os.makedirs(self.directory, exist_ok=True)
+        for (year, month), records in sorted(records_by_month.items()):
+            with self.opener(self.segment_path(year, month), "at", encoding="utf-8") as segment:
+                for record in records:
+                    segment.write(json.dumps(record))
+                    segment.write("\n")
+
+    def iter_records(self, patient_id=None, doctor_id=None, patient_ids=None):
+        # Lazily read archived records, one segment at a time, optionally for one patient
+        # (or any of a set of patient IDs) or doctor
+        if patient_id is not None:
+            patient_ids = {patient_id, *(patient_ids or ())}
+        for path in self.segments():
+            with self.opener(path, "rt", encoding="utf-8") as segment:
+                for line in segment:
+                    record = json.loads(line)
+                    if patient_ids is not None and record["patient_id"] not in patient_ids:
+                        continue
+                    if doctor_id is not None and record["doctor_id"] != doctor_id:
+                        continue
+                    yield record
+
+    def iter_consultations(self, patient_id=None, doctor_id=None, patient_ids=None):
+        for record in self.iter_records(patient_id, doctor_id, patient_ids):
+            consultation = Consultation(record["date"], record["description"], record["fee"], record["patient_id"], record["doctor_id"])
+            consultation.consultation_id = record["consultation_id"]
+            yield consultation
+
+
+def archive_old_consultations(model, archive, months=RETENTION_MONTHS, today=None):
+    # Move consultations dated before the retention window into the archive
+    # Fee totals and workload aggregates are lifetime figures and are left as they are
+    # Returns the number of consultations archived
+    return archive_before(model, archive, cutoff_month(months, today))
+
+
+def archive_before(model, archive, cutoff):
+    # Move consultations dated before the (year, month) cutoff into the archive
+    def is_old(consultation):
+        month = consultation_month(consultation)
+        return month is not None and month < cutoff
+
+    with model.lock.write_locked():
+        # Every consultation knows its patient and doctor, so one pass over the patients finds them all
+        old = {}
+        records_by_month = {}
+        for patient in model.patients:
+            for consultation in patient.consultations:
+                if is_old(consultation):
+                    old[id(consultation)] = consultation
+                    records_by_month.setdefault(consultation_month(consultation), []).append({
+                        "consultation_id": consultation.consultation_id,
+                        "patient_id": consultation.patient_id,
+                        "doctor_id": consultation.doctor_id,
+                        "date": consultation.date,
+                        "description": consultation.description,
+                        "fee": consultation.fee,
+                    })
+        if not old:
+            return 0
+
+        # Write first so nothing leaves memory unless it is safely on disk
+        archive.append(records_by_month)
+
+        # Only the patients and doctors that lose something have their lists rebuilt
+        touched = {}
+        for consultation in old.values():
+            for entity in (model.patients_by_id[consultation.patient_id], model.doctors_by_id[consultation.doctor_id]):
+                touched[id(entity)] = entity
+        for entity in touched.values():
+            kept = [consultation for consultation in entity.consultations if id(consultation) not in old]
+            entity.archived_count += len(entity.consultations) - len(kept)
+            entity.consultations = kept
+        for key in {(consultation.doctor_id, consultation.patient_id) for consultation in old.values()}:
+            kept = [consultation for consultation in model.consultations_by_pair[key] if id(consultation) not in old]
+            if kept:
+                model.consultations_by_pair[key] = kept
+            else:
+                del model.consultations_by_pair[key]
+        for consultation in old.values():
+            del model.consultations_by_id[consultation.consultation_id]
+            model.descriptions.remove(consultation.consultation_id, consultation.description)
+        model.notify("archive", count=len(old), cutoff=cutoff)
+        return len(old)
+
+
+def iter_full_consultation_report(patient, archive, merged_ids=()):
+    # Archived consultations first (read lazily), then the ones still in memory
+    # merged_ids are the duplicates merged into the patient, whose archived records carry their old IDs
+    for consultation in archive.iter_consultations(patient_id=patient.patient_id, patient_ids=merged_ids):
+        yield f"{consultation}\n"
+    for consultation in patient.consultations:
+        yield f"{consultation}\n"
@@ -0,0 +1,156 @@
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+from itertools import islice
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import tkinter as tk
+
+# Soak test for the pooled information windows
+# Clicks "View Doctor Info", "View Patient Info" and "View Consultation Report"
+# thousands of times on random IDs and samples traced Python memory and the
+# number of open windows. With pooling both should level off after warm-up.
+# With --headless, or when there is no display, the same views go through the
+# pool with stub windows in place of Tk ones, while patients are reassigned and
+# windows closed along the way so cached text goes stale and hidden windows are
+# reused; this checks the pool's own bookkeeping without a display.
+
+ACTIONS = ("view_doctor_info", "view_patient_info", "view_consultation_report")
+
+
+class StubWindow:
+    # Stands in for InfoWindow: keeps the first page of lines the way the real window does
+    def __init__(self, root, on_close):
+        self.on_close = on_close
+        self.key = None
+        self.stamp = None
+        self.title = ""
+        self.text = ""
+        self.visible = False
+
+    def show(self, title, lines, empty_text, page_size):
+        self.title = title
+        self.text = "".join(islice(lines, page_size)) or empty_text
+        self.visible = True
+
+    def raise_window(self):
+        self.visible = True
+
+    def hide(self):
+        self.visible = False
+
+
+def soak(click, count_windows, clicks, sample_every):
+    # Call click(n) clicks times; returns (click, traced bytes, windows) samples
+    tracemalloc.start()
+    samples = []
+    for n in range(1, clicks + 1):
+        click(n)
+        if n % sample_every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            windows = count_windows()
+            samples.append((n, current, windows))
+            print(f"{n:>8} clicks  {current / 1024:>10.1f} KiB traced  {windows:>3} windows")
+    tracemalloc.stop()
+    return samples
+
+
+def run_gui(root, args):
+    root.withdraw()
+    os.chdir(ROOT)
+    from main import MedicalCenterApp
+
+    app = MedicalCenterApp(root)
+    app.create_info_buttons()
+    doctor_ids = list(app.model.doctors_by_id)
+    patient_ids = list(app.model.patients_by_id)
+    rng = random.Random(args.seed)
+
+    def click(n):
+        action = rng.choice(ACTIONS)
+        ids = doctor_ids if action == "view_doctor_info" else patient_ids
+        app.info_id_var.set(str(rng.choice(ids)))
+        getattr(app, action)()
+        if n % 100 == 0:
+            root.update()
+
+    def count_windows():
+        return sum(1 for child in root.winfo_children() if isinstance(child, tk.Toplevel))
+
+    samples = soak(click, count_windows, args.clicks, args.sample_every)
+    root.destroy()
+    return samples, app.info_windows
+
+
+def run_headless(args):
+    os.chdir(ROOT)
+    from infopane import EntityVersions, InfoWindowPool
+    from model import MedicalCenterModel
+
+    model = MedicalCenterModel()
+    model.load_doctors_data()
+    model.load_patients_data()
+    versions = EntityVersions(model)
+    pool = InfoWindowPool(None, window_factory=StubWindow)
+    doctors = list(model.doctors)
+    patients = list(model.patients)
+    rng = random.Random(args.seed)
+
+    def click(n):
+        # The same calls MedicalCenterApp makes for each view
+        action = rng.choice(ACTIONS)
+        if action == "view_doctor_info":
+            doctor = rng.choice(doctors)
+            pool.show_text(("doctor", doctor.doctor_id), f"Doctor {doctor.first_name} {doctor.last_name}", doctor.get_info, versions.doctor_stamp(doctor))
+        else:
+            patient = rng.choice(patients)
+            if action == "view_patient_info":
+                pool.show_text(("patient", patient.patient_id), f"Patient {patient.first_name} {patient.last_name}", patient.get_info, versions.patient_stamp(patient))
+            else:
+                pool.show(("report", patient.patient_id), f"Consultation Report: {patient.first_name} {patient.last_name}", patient.iter_consultation_report(), stamp=versions.patient_stamp(patient))
+        if n % 10 == 0:
+            model.assign_patient_to_doctor(rng.choice(patients).patient_id, rng.choice(doctors).doctor_id)
+        if n % 25 == 0 and pool.windows:
+            window = rng.choice(list(pool.windows.values()))
+            window.on_close(window)
+
+    def count_windows():
+        return sum(1 for window in list(pool.windows.values()) + pool.hidden if window.visible)
+
+    samples = soak(click, count_windows, args.clicks, args.sample_every)
+    return samples, pool
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Repeated info-window views should not grow memory or windows.")
+    parser.add_argument("--clicks", type=int, default=10_000)
+    parser.add_argument("--sample-every", type=int, default=1_000)
+    parser.add_argument("--max-growth-kb", type=float, default=256, help="Allowed growth in traced memory after the first sample")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--headless", action="store_true", help="Use stub windows instead of Tk ones")
+    args = parser.parse_args(argv)
+
+    root = None
+    if not args.headless:
+        try:
+            root = tk.Tk()
+        except tk.TclError as error:
+            print(f"no display ({error}); using stub windows")
+    samples, pool = run_gui(root, args) if root is not None else run_headless(args)
+    print(f"windows created by the pool: {pool.created}")
+
+    growth_kb = (samples[-1][1] - samples[0][1]) / 1024
+    max_windows = max(windows for _, _, windows in samples)
+    print(f"growth after first sample: {growth_kb:.1f} KiB, most windows open: {max_windows}")
+    if growth_kb > args.max_growth_kb or max_windows > pool.limit or pool.created > pool.limit:
+        print("FAIL: memory or window count kept growing")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intake import IntakeClient, IntakeServer
+from model import Doctor, MedicalCenterModel, Patient
+from workload import percentile
+
+# Load test for the consultation intake server
+# Simulates many front-desk terminals, each on its own connection, submitting
+# consultations as fast as they get answers (or with a think time), and reports
+# sustained ingest throughput, queue latency (queued -> applied on the writer
+# thread), round-trip time seen by the terminals and how often they were told
+# to back off
+
+
+def build_model(doctor_count, patient_count):
+    model = MedicalCenterModel()
+    for i in range(doctor_count):
+        model.add_doctor(Doctor(1000 + i, f"Doctor{i}", "Test", "General Practitioner"))
+    for i in range(patient_count):
+        model.add_patient(Patient(2000 + i, f"Patient{i}", "Test"))
+    return model
+
+
+def terminal(address, submissions, think, seed, round_trips, retries):
+    rng = random.Random(seed)
+    times = []
+    with IntakeClient(address) as client:
+        for _ in range(submissions):
+            start = time.perf_counter()
+            client.submit(2000 + rng.randrange(500), 1000 + rng.randrange(20), "2024-01-01", "Check-up", "50")
+            times.append(time.perf_counter() - start)
+            if think:
+                time.sleep(rng.uniform(0, 2 * think))
+        retries.append(client.retries)
+    round_trips.extend(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Many terminals submitting consultations to one intake server.")
+    parser.add_argument("--terminals", type=int, default=50)
+    parser.add_argument("--submissions", type=int, default=400, help="Submissions per terminal")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean pause in seconds between a terminal's submissions")
+    parser.add_argument("--queue-size", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    model = build_model(20, 500)
+    round_trips = []
+    retries = []
+    with IntakeServer(model, ("127.0.0.1", 0), args.queue_size, args.batch_size) as server:
+        threads = [threading.Thread(target=terminal, args=(server.address, args.submissions, args.think, i, round_trips, retries)) for i in range(args.terminals)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    total = args.terminals * args.submissions
+    queued = sorted(server.queue_latencies)
+    trips = sorted(round_trips)
+    print(f"{args.terminals} terminals, {total:,} consultations in {elapsed:.2f}s ({server.applied / elapsed:,.0f}/s)")
+    print(f"batches: {server.batches} (average {server.applied / max(server.batches, 1):.1f} per batch)")
+    print(f"queue latency ms: p50 {percentile(queued, 0.5) * 1000:.2f}  p99 {percentile(queued, 0.99) * 1000:.2f}  max {queued[-1] * 1000:.2f}")
+    print(f"round trip ms:    p50 {percentile(trips, 0.5) * 1000:.2f}  p99 {percentile(trips, 0.99) * 1000:.2f}  max {trips[-1] * 1000:.2f}")
+    print(f"busy replies: {server.busy} ({sum(retries)} client retries)")
+
+    recorded = sum(len(doctor.consultations) for doctor in model.doctors)
+    if len(retries) != args.terminals or server.applied != total or recorded != total:
+        print(f"FAIL: expected {total} consultations, server applied {server.applied}, model holds {recorded}")
+        return 1
+    print("all submissions recorded: OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sharding import ShardRouter
+
+# Compares cross-site search latency with the latency of each site on its own
+# With the router's fan-out the combined query should track the slowest site,
+# not the sum of all sites
+
+
+def write_site(directory, doctors, patients):
+    os.makedirs(directory)
+    with open(os.path.join(directory, "Doctor.txt"), "w") as file:
+        for i in range(doctors):
+            file.write(f"Doctor{i},Surname{i},General Practitioner\n")
+    with open(os.path.join(directory, "Patient.txt"), "w") as file:
+        for i in range(patients):
+            file.write(f"Patient{i},Surname{i}\n")
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-site search latency against per-site latency.")
+    parser.add_argument("--sites", type=int, default=4)
+    parser.add_argument("--patients", type=int, default=200000, help="Patients per site")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as root:
+        sites = {}
+        for i in range(args.sites):
+            directory = os.path.join(root, f"site{i}")
+            write_site(directory, 50, args.patients)
+            sites[f"site{i}"] = directory
+
+        with ShardRouter(sites, timeout=60.0) as router:
+            per_site = {site: timed(lambda site=site: router.call(site, "search", "surname1"), args.repeat) for site in sites}
+            combined = timed(lambda: router.search("surname1"), args.repeat)
+
+    for site, elapsed in per_site.items():
+        print(f"{site}: {elapsed * 1000:.1f} ms")
+    print(f"slowest site: {max(per_site.values()) * 1000:.1f} ms")
+    print(f"sum of sites: {sum(per_site.values()) * 1000:.1f} ms")
+    print(f"fan-out:      {combined * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
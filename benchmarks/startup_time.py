@@ -0,0 +1,68 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Startup-time benchmark for the batch (model only) and GUI import paths
+# Uses `python -X importtime` and reports the cumulative import time of each
+# entry module, the wall time of the whole interpreter run, and whether tkinter
+# was pulled in. The GUI window itself is only built when a display is available.
+
+PATHS = {
+    "cli": "import model",
+    "export": "import export",
+    "gui": "import main",
+}
+
+GUI_BUILD = "import tkinter as tk, main; root = tk.Tk(); main.MedicalCenterApp(root); root.update(); root.destroy()"
+
+
+def parse_importtime(stderr):
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, total_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(total_us)
+    return cumulative
+
+
+def run(code, repeat):
+    best_wall = None
+    best_imports = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True)
+        wall = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        if best_wall is None or wall < best_wall:
+            best_wall = wall
+            best_imports = parse_importtime(result.stderr)
+    return best_wall, best_imports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure startup time of the CLI and GUI paths.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for label, code in PATHS.items():
+        wall, imports = run(code, args.repeat)
+        module = code.split()[-1]
+        print(f"{label:7} {module:8} import {imports.get(module, 0) / 1000:7.1f} ms  wall {wall * 1000:7.1f} ms  tkinter loaded: {'tkinter' in imports}")
+
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        wall, imports = run(GUI_BUILD, args.repeat)
+        print(f"gui     window   built in wall {wall * 1000:7.1f} ms")
+    else:
+        print("gui     window   skipped (no display)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import Doctor, MedicalCenterModel, Patient
+
+# Stress test for the thread-safe model
+# Runs concurrent writers (assign / consult) and readers (lookups / get_info),
+# then checks that patient and doctor links still agree and that no
+# consultation was lost, and reports throughput for both sides
+
+
+def build_model(doctor_count, patient_count):
+    model = MedicalCenterModel()
+    for i in range(doctor_count):
+        model.add_doctor(Doctor(1000 + i, f"Doctor{i}", "Test", "General Practitioner"))
+    for i in range(patient_count):
+        model.add_patient(Patient(2000 + i, f"Patient{i}", "Test"))
+    return model
+
+
+def writer(model, operations, seed, counts):
+    rng = random.Random(seed)
+    doctor_ids = list(model.doctors_by_id)
+    patient_ids = list(model.patients_by_id)
+    consultations = 0
+    for _ in range(operations):
+        patient_id = rng.choice(patient_ids)
+        doctor_id = rng.choice(doctor_ids)
+        if rng.random() < 0.5:
+            model.assign_patient_to_doctor(patient_id, doctor_id)
+        else:
+            model.add_consultation(patient_id, doctor_id, "2024-01-01", "Check-up", "50")
+            consultations += 1
+    counts.append(consultations)
+
+
+def reader(model, stop, seed, counts):
+    rng = random.Random(seed)
+    doctor_ids = list(model.doctors_by_id)
+    patient_ids = list(model.patients_by_id)
+    reads = 0
+    while not stop.is_set():
+        doctor = model.get_doctor(rng.choice(doctor_ids))
+        patient = model.get_patient(rng.choice(patient_ids))
+        with model.lock.read_locked():
+            doctor.get_info()
+            # A patient's doctor must list the patient while we hold the read lock
+            if patient.doctor is not None and patient not in patient.doctor.patients:
+                raise AssertionError(f"Patient {patient.patient_id} missing from doctor {patient.doctor.doctor_id}")
+        reads += 1
+    counts.append(reads)
+
+
+def check_invariants(model, expected_consultations):
+    problems = []
+    for patient in model.patients:
+        holders = [doctor for doctor in model.doctors if patient in doctor.patients]
+        expected = [patient.doctor] if patient.doctor else []
+        if holders != expected:
+            problems.append(f"Patient {patient.patient_id} is listed by {len(holders)} doctors")
+    for doctor in model.doctors:
+        if len(doctor.patients) != len(set(map(id, doctor.patients))):
+            problems.append(f"Doctor {doctor.doctor_id} lists a patient twice")
+    patient_total = sum(len(patient.consultations) for patient in model.patients)
+    doctor_total = sum(len(doctor.consultations) for doctor in model.doctors)
+    if patient_total != expected_consultations or doctor_total != expected_consultations:
+        problems.append(f"Expected {expected_consultations} consultations, patients hold {patient_total}, doctors hold {doctor_total}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent writers and readers against MedicalCenterModel.")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=5000, help="Operations per writer")
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--patients", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    model = build_model(args.doctors, args.patients)
+    stop = threading.Event()
+    write_counts = []
+    read_counts = []
+
+    writers = [threading.Thread(target=writer, args=(model, args.operations, i, write_counts)) for i in range(args.writers)]
+    readers = [threading.Thread(target=reader, args=(model, stop, 1000 + i, read_counts)) for i in range(args.readers)]
+
+    start = time.perf_counter()
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    write_elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total_writes = args.writers * args.operations
+    total_reads = sum(read_counts)
+    print(f"writes: {total_writes} in {write_elapsed:.2f}s ({total_writes / write_elapsed:,.0f}/s)")
+    print(f"reads:  {total_reads} in {elapsed:.2f}s ({total_reads / elapsed:,.0f}/s)")
+
+    if len(read_counts) != args.readers:
+        print("FAIL: a reader thread stopped early")
+        return 1
+    problems = check_invariants(model, sum(write_counts))
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if not problems:
+        print("invariants: OK")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from textindex import ConsultationIndex, parse_query, tokenize
+
+# Full-text search benchmark
+# Builds the description index over synthetic consultation descriptions and
+# compares query time against the old approach of testing every description,
+# for rare, common, AND, OR and prefix queries
+
+COMMON = ["check-up", "follow-up", "review", "routine", "prescription", "blood", "pressure", "test", "results", "pain", "fever", "cough"]
+RARE = ["asthma", "inhaler", "wheezing", "migraine", "fracture", "eczema", "vertigo", "tinnitus", "gout", "anaemia", "shingles", "sciatica"]
+
+QUERIES = [
+    "tinnitus",
+    "pain",
+    "asthma fever",
+    "asthma OR migraine",
+    "wheez*",
+    "blood AND pressure AND gout",
+]
+
+
+def synthetic_descriptions(count, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = rng.sample(COMMON, 3)
+        # Roughly one description in twenty mentions a rarer condition
+        if rng.random() < 0.05:
+            words.append(rng.choice(RARE))
+        yield " ".join(words)
+
+
+def scan(descriptions, query):
+    # What searching looked like without an index: test every description
+    clauses = parse_query(query)
+    matches = []
+    for consultation_id, description in enumerate(descriptions, start=1):
+        words = tokenize(description)
+        for clause in clauses:
+            if all(any(word.startswith(term) if prefix else word == term for word in words) for term, prefix in clause):
+                matches.append(consultation_id)
+                break
+    return matches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inverted index vs. linear scan over consultation descriptions.")
+    parser.add_argument("--count", type=int, default=1_000_000, help="Number of synthetic descriptions")
+    parser.add_argument("--scan-limit", type=int, default=200_000, help="Only time the linear scan on this many descriptions, then scale up")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    descriptions = list(synthetic_descriptions(args.count, args.seed))
+    index = ConsultationIndex()
+    start = time.perf_counter()
+    for consultation_id, description in enumerate(descriptions, start=1):
+        index.add(consultation_id, description)
+    build = time.perf_counter() - start
+    print(f"indexed {args.count:,} descriptions in {build:.2f}s ({args.count / build:,.0f}/s), {len(index.postings)} distinct words")
+
+    sample = descriptions[:args.scan_limit]
+    scale = len(descriptions) / len(sample)
+    print(f"{'query':<30}{'matches':>10}{'index ms':>12}{'scan ms':>12}{'speed-up':>10}")
+    failed = False
+    for query in QUERIES:
+        start = time.perf_counter()
+        ids = index.search(query)
+        indexed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanned = scan(sample, query)
+        scanned_time = (time.perf_counter() - start) * scale
+
+        # Both must agree on the part of the history the scan covered
+        if [consultation_id for consultation_id in ids if consultation_id <= len(sample)] != scanned:
+            print(f"FAIL: index and scan disagree for {query!r}")
+            failed = True
+        print(f"{query:<30}{len(ids):>10,}{indexed * 1000:>12.2f}{scanned_time * 1000:>12.0f}{scanned_time / indexed:>9.0f}x")
+    if args.scan_limit < args.count:
+        print(f"scan times measured on {len(sample):,} descriptions and scaled to {args.count:,}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
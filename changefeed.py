@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from archive import archive_before
+from model import Consultation, Doctor, MedicalCenterModel, Patient
+
+# Change-data-capture feed
+# ChangeFeed listens to the model and appends every change to a JSON Lines file
+# with a sequence number, in the order the changes happened:
+#
+#     {"seq": 0, "event": "start", "session": "..."}
+#     {"seq": 1, "event": "add_doctor", "doctor_id": 1000, ...}
+#     {"seq": 42, "event": "assign", "patient_id": 2003, "doctor_id": 1001}
+#
+# The file can be tailed by other processes. A Follower applies the records to
+# its own MedicalCenterModel, which it treats as a read-only replica, remembering
+# the last sequence number it applied so it can pick up where it left off.
+# The model is rebuilt from the data files at every start, so each run of the
+# GUI begins a new session, appended to the same file so that consultations
+# nobody has exported yet survive a restart; a follower that sees a new session
+# starts over. Consult records carry the patient's name, so the consultations
+# after any byte offset can be read without replaying the file from the start.
+
+
+class FeedError(Exception):
+    pass
+
+
+def change_record(event, details):
+    # Turn a model notification into plain data; None for events the feed does not carry
+    if event == "add_doctor":
+        doctor = details["doctor"]
+        return {"doctor_id": doctor.doctor_id, "first_name": doctor.first_name, "last_name": doctor.last_name, "specialisation": doctor.specialisation}
+    if event == "add_patient":
+        patient = details["patient"]
+        return {"patient_id": patient.patient_id, "first_name": patient.first_name, "last_name": patient.last_name}
+    if event == "assign":
+        return {"patient_id": details["patient"].patient_id, "doctor_id": details["doctor"].doctor_id}
+    if event == "unassign":
+        return {"patient_id": details["patient"].patient_id}
+    if event == "consult":
+        consultation = details["consultation"]
+        return {
+            "consultation_id": consultation.consultation_id,
+            "patient_id": consultation.patient_id,
+            "patient_name": f"{details['patient'].first_name} {details['patient'].last_name}",
+            "doctor_id": consultation.doctor_id,
+            "date": consultation.date,
+            "description": consultation.description,
+            "fee": consultation.fee,
+        }
+    if event == "remove_consultation":
+        return {"consultation_id": details["consultation"].consultation_id}
+    if event == "merge":
+        return {"keep_id": details["keep"].patient_id, "duplicate_id": details["duplicate"].patient_id}
+    if event == "archive":
+        return {"cutoff": list(details["cutoff"])}
+    return None
+
+
+def trim_partial_record(path):
+    # Drop a record left half written by a crash, so the next record starts on its own line
+    try:
+        with open(path, "rb+") as feed:
+            end = position = feed.seek(0, os.SEEK_END)
+            while position > 0:
+                step = min(4096, position)
+                feed.seek(position - step)
+                newline = feed.read(step).rfind(b"\n")
+                if newline >= 0:
+                    position += newline + 1 - step
+                    break
+                position -= step
+            if position != end:
+                feed.truncate(position)
+    except FileNotFoundError:
+        pass
+
+
+class ChangeFeed:
+    # Model listener that appends each change to the feed file
+    def __init__(self, model, path):
+        self.model = model
+        self.session = model.session_id
+        self.sequence = 0
+        # Appended to, never truncated; line buffered so a follower never waits for a partly written record for long
+        trim_partial_record(path)
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+        self._write({"seq": 0, "event": "start", "session": self.session})
+        model.add_listener(self)
+
+    def _write(self, record):
+        self.file.write(json.dumps(record))
+        self.file.write("\n")
+
+    def __call__(self, event, details):
+        # Called with the model's write lock held, so sequence numbers follow the order of changes
+        record = change_record(event, details)
+        if record is None:
+            return
+        self.sequence += 1
+        self._write({"seq": self.sequence, "event": event, **record})
+
+    def close(self):
+        self.model.remove_listener(self)
+        self.file.close()
+
+
+class DiscardArchive:
+    # Archive stand-in for replicas: the primary already wrote the records to disk
+    def append(self, records_by_month):
+        pass
+
+
+class Follower:
+    def __init__(self, path, model=None):
+        self.path = path
+        self.model = model or MedicalCenterModel()
+        self.session = None
+        self.sequence = 0
+        self.offset = 0 # bytes of the feed file already read
+
+    def reset(self):
+        # Start again with an empty replica, e.g. when the primary began a new session
+        self.model = MedicalCenterModel()
+        self.session = None
+        self.sequence = 0
+
+    def poll(self):
+        # Apply every complete record written since the last poll; returns how many were applied
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        if size < self.offset:
+            # The file was replaced; read it again and skip what has already been applied
+            self.offset = 0
+        applied = 0
+        with open(self.path, "rb") as feed:
+            feed.seek(self.offset)
+            for line in feed:
+                if not line.endswith(b"\n"):
+                    break # the primary is still writing this record
+                self.offset += len(line)
+                applied += self.apply(json.loads(line))
+        return applied
+
+    def follow(self, interval=0.5, stop=None):
+        # Keep polling until stop (a threading.Event) is set
+        while stop is None or not stop.is_set():
+            if not self.poll():
+                time.sleep(interval)
+
+    def apply(self, record):
+        sequence = record["seq"]
+        if record["event"] == "start":
+            if record["session"] != self.session:
+                self.reset()
+                self.session = record["session"]
+                # The replica carries on the primary's run, consultation IDs included
+                self.model.session_id = self.session
+            return 0
+        if self.session is None or sequence <= self.sequence:
+            return 0
+        if sequence != self.sequence + 1:
+            raise FeedError(f"Feed skipped from sequence {self.sequence} to {sequence}")
+        getattr(self, f"apply_{record['event']}")(record)
+        self.sequence = sequence
+        return 1
+
+    def apply_add_doctor(self, record):
+        self.model.add_doctor(Doctor(record["doctor_id"], record["first_name"], record["last_name"], record["specialisation"]))
+
+    def apply_add_patient(self, record):
+        self.model.add_patient(Patient(record["patient_id"], record["first_name"], record["last_name"]))
+
+    def apply_assign(self, record):
+        self.model.assign_patient_to_doctor(record["patient_id"], record["doctor_id"])
+
+    def apply_unassign(self, record):
+        self.model.unassign_patient(record["patient_id"])
+
+    def apply_consult(self, record):
+        consultation = Consultation(record["date"], record["description"], record["fee"])
+        # Keep the primary's ID so later removals can find it
+        consultation.consultation_id = record["consultation_id"]
+        self.model.attach_consultation(record["patient_id"], record["doctor_id"], consultation)
+        self.model.next_consultation_id = max(self.model.next_consultation_id, consultation.consultation_id + 1)
+
+    def apply_remove_consultation(self, record):
+        consultation = self.model.consultations_by_id[record["consultation_id"]]
+        self.model.remove_consultation(consultation.patient_id, consultation.doctor_id, consultation)
+
+    def apply_merge(self, record):
+        self.model.merge_patients(record["keep_id"], record["duplicate_id"])
+
+    def apply_archive(self, record):
+        archive_before(self.model, DiscardArchive(), tuple(record["cutoff"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Follow a change feed and keep a replica of the model up to date.")
+    parser.add_argument("feed", help="Feed file written by main.py --feed")
+    parser.add_argument("--once", action="store_true", help="Apply what is in the feed now and exit")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls (default: 1)")
+    args = parser.parse_args(argv)
+
+    follower = Follower(args.feed)
+    while True:
+        applied = follower.poll()
+        if applied or args.once:
+            model = follower.model
+            with model.lock.read_locked():
+                consultations = len(model.consultations_by_id)
+            print(f"seq {follower.sequence}: {len(model.doctors)} doctors, {len(model.patients)} patients, {consultations} consultations")
+        if args.once:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import argparse
+import sys
+import unicodedata
+from itertools import islice
+
+# Duplicate patient detection
+# Every patient is filed under a few blocking keys: the normalised full name and
+# the Soundex codes of first and last name. Only patients that share a bucket are
+# compared, so finding candidates costs about O(n) instead of comparing every pair.
+# A bucket can still grow large (digits are dropped, so "Patient1" and "Patient2"
+# share one), so an insert only reports the first CANDIDATE_LIMIT members of each
+# bucket; the full groups come from candidate_groups().
+
+CANDIDATE_LIMIT = 10
+
+SOUNDEX_CODES = {}
+for letters, code in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")):
+    for letter in letters:
+        SOUNDEX_CODES[letter] = code
+
+
+def normalize_name(name):
+    # Lower case, accents removed, and anything that is not a letter dropped
+    decomposed = unicodedata.normalize("NFKD", name)
+    return "".join(char for char in decomposed.lower() if char.isalpha() and char.isascii())
+
+
+def soundex(name):
+    name = normalize_name(name)
+    if not name:
+        return ""
+    code = name[0].upper()
+    previous = SOUNDEX_CODES.get(name[0], "")
+    for char in name[1:]:
+        digit = SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code; vowels do
+        if char not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def blocking_keys(patient):
+    first = normalize_name(patient.first_name)
+    last = normalize_name(patient.last_name)
+    keys = [("name", first, last)]
+    if first or last:
+        keys.append(("sound", soundex(patient.first_name), soundex(patient.last_name)))
+    return keys
+
+
+class DuplicateIndex:
+    # Hash buckets of patient IDs keyed by blocking key, kept up to date on insert and removal
+    # Buckets are dicts used as insertion-ordered sets, so adding and removing are O(1)
+    def __init__(self, candidate_limit=CANDIDATE_LIMIT):
+        self.buckets = {}
+        self.keys_by_patient = {}
+        self.candidate_limit = candidate_limit
+
+    def add(self, patient):
+        # File the patient and return the IDs of existing patients that share a bucket,
+        # at most candidate_limit from each bucket
+        candidates = {}
+        keys = blocking_keys(patient)
+        for key in keys:
+            bucket = self.buckets.setdefault(key, {})
+            for patient_id in islice(bucket, self.candidate_limit):
+                candidates[patient_id] = None
+            bucket[patient.patient_id] = None
+        self.keys_by_patient[patient.patient_id] = keys
+        return list(candidates)
+
+    def remove(self, patient):
+        for key in self.keys_by_patient.pop(patient.patient_id, []):
+            bucket = self.buckets[key]
+            del bucket[patient.patient_id]
+            if not bucket:
+                del self.buckets[key]
+
+    def candidate_groups(self):
+        # Merge overlapping buckets into groups of patient IDs that may be the same person
+        parent = {}
+
+        def find(patient_id):
+            root = parent.setdefault(patient_id, patient_id)
+            while parent[root] != root:
+                root = parent[root]
+            while patient_id != root:
+                next_id = parent[patient_id]
+                parent[patient_id] = root
+                patient_id = next_id
+            return root
+
+        for bucket in self.buckets.values():
+            if len(bucket) < 2:
+                continue
+            members = iter(bucket)
+            first = find(next(members))
+            for patient_id in members:
+                other = find(patient_id)
+                if other != first:
+                    parent[other] = first
+
+        groups = {}
+        for patient_id in parent:
+            groups.setdefault(find(patient_id), []).append(patient_id)
+        return sorted(sorted(group) for group in groups.values())
+
+
+def iter_duplicate_report(model):
+    # Yield one report line per group of merge candidates
+    # The groups are copied under the read lock and the lines built after it is released,
+    # so a paged window that stops reading part way does not keep writers waiting
+    with model.lock.read_locked():
+        groups = []
+        for group in model.duplicates.candidate_groups():
+            patients = [model.patients_by_id[patient_id] for patient_id in group]
+            groups.append([(patient.patient_id, patient.first_name, patient.last_name, len(patient.consultations)) for patient in patients])
+    for patients in groups:
+        names = {(normalize_name(first_name), normalize_name(last_name)) for _, first_name, last_name, _ in patients}
+        reason = "same name" if len(names) == 1 else "similar sounding name"
+        listed = ", ".join(f"{patient_id} {first_name} {last_name} ({count} consultations)" for patient_id, first_name, last_name, count in patients)
+        yield f"{listed} - {reason}\n"
+
+
+def get_duplicate_report(model):
+    return "".join(iter_duplicate_report(model)) or "No duplicate patients found.\n"
+
+
+def main(argv=None):
+    from model import MedicalCenterModel
+
+    parser = argparse.ArgumentParser(description="Report patients that are probably entered more than once.")
+    parser.add_argument("--patients", default="Patient.txt", help="Patient data file (default: Patient.txt)")
+    args = parser.parse_args(argv)
+
+    model = MedicalCenterModel()
+    model.load_patients_data(args.patients)
+    sys.stdout.write(get_duplicate_report(model))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from model import MedicalCenterModel, format_fee
+
+# Streaming exporter for nightly reports
+# Every record is written to the file handle as soon as it is produced, so memory
+# use does not grow with the number of doctors, patients or consultations
+
+DOCTOR_FIELDS = ["doctor_id", "first_name", "last_name", "specialisation", "patient_count", "consultation_count", "total_fees"]
+CONSULTATION_FIELDS = ["consultation_id", "patient_id", "patient_name", "doctor_id", "date", "description", "fee"]
+
+FORMATS = ["csv", "jsonl", "text"]
+
+def iter_doctor_records(model):
+    # One record per doctor, matching the fields shown by Doctor.get_info
+    for doctor in model.doctors:
+        yield {
+            "doctor_id": doctor.doctor_id,
+            "first_name": doctor.first_name,
+            "last_name": doctor.last_name,
+            "specialisation": doctor.specialisation,
+            "patient_count": len(doctor.patients),
+            "consultation_count": len(doctor.consultations),
+            "total_fees": format_fee(doctor.total_fees),
+        }
+
+
+def consultation_record(patient, consultation):
+    return {
+        "consultation_id": consultation.consultation_id,
+        "patient_id": patient.patient_id,
+        "patient_name": f"{patient.first_name} {patient.last_name}",
+        "doctor_id": consultation.doctor_id,
+        "date": consultation.date,
+        "description": consultation.description,
+        "fee": format_fee(consultation.fee),
+    }
+
+
+def iter_consultation_records(model):
+    # One record per consultation, in the order of each patient's consultation report
+    for patient in model.patients:
+        for consultation in patient.consultations:
+            yield consultation_record(patient, consultation)
+
+
+def iter_feed_records(path, start, end):
+    # (offset after the record, record) for each complete change feed record between two byte offsets
+    position = start
+    with open(path, "rb") as feed:
+        feed.seek(start)
+        for line in feed:
+            if position + len(line) > end or not line.endswith(b"\n"):
+                break # past the end of this run, or still being written
+            position += len(line)
+            yield position, json.loads(line)
+
+
+def feed_consultation_record(record):
+    return {
+        "consultation_id": record["consultation_id"],
+        "patient_id": record["patient_id"],
+        "patient_name": record["patient_name"],
+        "doctor_id": record["doctor_id"],
+        "date": record["date"],
+        "description": record["description"],
+        "fee": format_fee(record["fee"]),
+    }
+
+
+def iter_new_feed_consultations(path, start, end):
+    # Consultations recorded in the feed between two byte offsets, minus those taken back
+    # later in the same span; an undone and redone consultation appears once, at its redo
+    # Two passes over the new part of the feed only, so the cost is O(new records) and
+    # memory holds just the IDs of removed consultations
+    # Consultation IDs restart in every session, so they are keyed by session
+    session = None
+    removed = {} # (session, consultation_id) -> sequence number of its last removal
+    for _, record in iter_feed_records(path, start, end):
+        if record["event"] == "start":
+            session = record["session"]
+        elif record["event"] == "remove_consultation":
+            removed[(session, record["consultation_id"])] = record["seq"]
+    session = None
+    for _, record in iter_feed_records(path, start, end):
+        if record["event"] == "start":
+            session = record["session"]
+        elif record["event"] == "consult" and removed.get((session, record["consultation_id"]), -1) < record["seq"]:
+            yield feed_consultation_record(record)
+
+
+def iter_doctor_text(model):
+    for doctor in model.doctors:
+        yield from doctor.iter_info()
+        yield "\n\n"
+
+
+def iter_consultation_text(model):
+    for patient in model.patients:
+        yield f"Consultation Report: {patient.patient_id} {patient.first_name} {patient.last_name}\n"
+        yield from patient.iter_consultation_report()
+        yield "\n"
+
+
+def write_csv(records, fields, handle):
+    writer = csv.DictWriter(handle, fieldnames=fields)
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+
+def write_jsonl(records, handle):
+    count = 0
+    for record in records:
+        handle.write(json.dumps(record))
+        handle.write("\n")
+        count += 1
+    return count
+
+
+def write_text(chunks, handle):
+    count = 0
+    for chunk in chunks:
+        handle.write(chunk)
+        count += 1
+    return count
+
+
+def export_doctors(model, handle, fmt="csv"):
+    # Write the per-doctor report in the requested format, returning the number of items written
+    if fmt == "csv":
+        return write_csv(iter_doctor_records(model), DOCTOR_FIELDS, handle)
+    if fmt == "jsonl":
+        return write_jsonl(iter_doctor_records(model), handle)
+    if fmt == "text":
+        return write_text(iter_doctor_text(model), handle)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_consultations(model, handle, fmt="csv"):
+    # Write every patient's consultation report in the requested format
+    if fmt == "csv":
+        return write_csv(iter_consultation_records(model), CONSULTATION_FIELDS, handle)
+    if fmt == "jsonl":
+        return write_jsonl(iter_consultation_records(model), handle)
+    if fmt == "text":
+        return write_text(iter_consultation_text(model), handle)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def read_checkpoint(path):
+    # The feed offset up to which consultations have been exported; the start of the feed if missing
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {"offset": 0}
+
+
+def write_checkpoint(path, offset):
+    # Write a new file and rename it over the old one so a crash never leaves half a checkpoint
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as handle:
+        json.dump({"offset": offset}, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+
+
+def export_new_consultations(feed_path, handle, checkpoint_path, fmt="csv"):
+    # Write the consultations appended to the change feed since the checkpoint, then advance it
+    # The feed is only ever appended to, so its byte offset goes up and is never reused, and
+    # a consultation that is redone or archived later is still found where it was recorded
+    # The checkpoint only moves once the output is flushed, so a failed run is simply
+    # repeated next time (a record may be delivered twice, never skipped)
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Incremental export supports csv and jsonl, not {fmt}")
+    start = read_checkpoint(checkpoint_path)["offset"]
+    size = os.path.getsize(feed_path)
+    if start > size:
+        start = 0 # the feed was replaced by a shorter file
+    end = start
+    for end, _ in iter_feed_records(feed_path, start, size):
+        pass
+    records = iter_new_feed_consultations(feed_path, start, end)
+    if fmt == "csv":
+        count = write_csv(records, CONSULTATION_FIELDS, handle)
+    else:
+        count = write_jsonl(records, handle)
+    handle.flush()
+    write_checkpoint(checkpoint_path, end)
+    return count
+
+
+EXPORTERS = {
+    "doctors": export_doctors,
+    "consultations": export_consultations,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Export clinic reports without starting the GUI.")
+    parser.add_argument("report", choices=sorted(EXPORTERS), help="Which report to export")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="csv", help="Output format (default: csv)")
+    parser.add_argument("-o", "--output", help="Output file (default: standard output)")
+    parser.add_argument("--doctors", default="Doctor.txt", help="Doctor data file (default: Doctor.txt)")
+    parser.add_argument("--patients", default="Patient.txt", help="Patient data file (default: Patient.txt)")
+    parser.add_argument("--feed", help="Build the model from a change feed (main.py --feed) instead of the data files")
+    parser.add_argument("--checkpoint", help="With --feed, only export consultations added to the feed since the offset recorded in this file, then advance it")
+    return parser
+
+
+def load_model(doctors_file, patients_file):
+    model = MedicalCenterModel()
+    model.load_doctors_data(doctors_file)
+    model.load_patients_data(patients_file)
+    return model
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.checkpoint and (args.report != "consultations" or args.format == "text" or not args.feed):
+        parser.error("--checkpoint needs --feed and the consultations report in csv or jsonl format")
+
+    if args.feed and not os.path.exists(args.feed):
+        parser.error(f"{args.feed} file not found.")
+
+    if args.checkpoint:
+        # Reads the feed from the checkpoint on, without rebuilding the model
+        model = None
+        def exporter(model, handle, fmt):
+            return export_new_consultations(args.feed, handle, args.checkpoint, fmt)
+    elif args.feed:
+        # Imported here so plain exports do not pull in the feed and archive modules
+        from changefeed import Follower
+        follower = Follower(args.feed)
+        follower.poll()
+        model = follower.model
+        exporter = EXPORTERS[args.report]
+    else:
+        for filename in (args.doctors, args.patients):
+            if not os.path.exists(filename):
+                parser.error(f"{filename} file not found.")
+        model = load_model(args.doctors, args.patients)
+        exporter = EXPORTERS[args.report]
+
+    if args.output:
+        with open(args.output, "w", newline="") as handle:
+            exporter(model, handle, args.format)
+    else:
+        exporter(model, sys.stdout, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import tkinter as tk
+from collections import Counter, OrderedDict
+from itertools import islice
+from tkinter import ttk
+
+from model import Doctor, Patient
+
+# Pooled information and report windows
+# Viewing a doctor, a patient or a report used to open a new Toplevel every time.
+# The pool keeps at most `limit` windows, keyed by what they show (for example
+# ("doctor", 1003)). Viewing the same thing again raises its window, viewing
+# something new reuses the least recently used window, and closing a window only
+# hides it so its widgets can be used again.
+#
+# Each window remembers a stamp of the content it shows. EntityVersions counts
+# model changes per doctor and patient, so a repeat view of an unchanged entity
+# just raises the window, and the text of recently viewed entities is cached.
+
+INFO_WINDOW_LIMIT = 4
+CONTENT_CACHE_LIMIT = 256
+PAGE_SIZE = 50
+
+
+class EntityVersions:
+    # Model listener that counts changes per doctor and patient
+    def __init__(self, model):
+        self.versions = Counter()
+        self.epoch = 0
+        model.add_listener(self)
+
+    def __call__(self, event, details):
+        if event == "archive":
+            # Archiving touches many entities at once, so everything is treated as changed
+            self.epoch += 1
+            return
+        for value in details.values():
+            if isinstance(value, Doctor):
+                self.versions[("doctor", value.doctor_id)] += 1
+            elif isinstance(value, Patient):
+                self.versions[("patient", value.patient_id)] += 1
+
+    def doctor_stamp(self, doctor):
+        return (self.epoch, self.versions[("doctor", doctor.doctor_id)])
+
+    def patient_stamp(self, patient):
+        # A patient's information includes their doctor's, so it changes with the doctor too
+        doctor = patient.doctor
+        doctor_version = (doctor.doctor_id, self.versions[("doctor", doctor.doctor_id)]) if doctor else None
+        return (self.epoch, self.versions[("patient", patient.patient_id)], doctor_version)
+
+
+class InfoWindow:
+    # A read-only, scrollable text window that pulls report lines a page at a time
+    def __init__(self, root, on_close):
+        self.toplevel = tk.Toplevel(root)
+        self.text = tk.Text(self.toplevel, width=80, height=20, wrap="word", state="disabled")
+        self.scrollbar = ttk.Scrollbar(self.toplevel, orient="vertical", command=self.text.yview)
+        self.text.pack(side="left", fill="both", expand=True, padx=(10, 0), pady=10)
+        self.scrollbar.pack(side="right", fill="y", pady=10)
+        self.text.config(yscrollcommand=self.on_scroll)
+        self.toplevel.protocol("WM_DELETE_WINDOW", lambda: on_close(self))
+
+        self.key = None
+        self.stamp = None
+        self.lines = iter(())
+        self.exhausted = True
+        self.loading = False
+        self.empty_text = ""
+        self.page_size = PAGE_SIZE
+
+    def show(self, title, lines, empty_text, page_size):
+        # Replace the content in place with a new line generator
+        self.toplevel.title(title)
+        self.lines = iter(lines)
+        self.exhausted = False
+        self.empty_text = empty_text
+        self.page_size = page_size
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.config(state="disabled")
+        self.load_next_page()
+        self.text.yview_moveto(0)
+        self.raise_window()
+
+    def raise_window(self):
+        self.toplevel.deiconify()
+        self.toplevel.lift()
+
+    def hide(self):
+        self.toplevel.withdraw()
+
+    def load_next_page(self):
+        if self.exhausted or self.loading:
+            return
+        self.loading = True
+        page = list(islice(self.lines, self.page_size))
+        if len(page) < self.page_size:
+            self.exhausted = True
+            # Let the generator and anything it holds go
+            self.lines = iter(())
+        self.text.config(state="normal")
+        if page:
+            self.text.insert("end", "".join(page))
+        elif self.text.compare("end-1c", "==", "1.0"):
+            self.text.insert("end", self.empty_text)
+        self.text.config(state="disabled")
+        self.loading = False
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= 0.9:
+            self.text.after_idle(self.load_next_page)
+
+
+class InfoWindowPool:
+    # window_factory(root, on_close) makes a new window; anything with InfoWindow's
+    # show, raise_window and hide methods and key and stamp attributes will do
+    def __init__(self, root, limit=INFO_WINDOW_LIMIT, window_factory=InfoWindow):
+        self.root = root
+        self.limit = limit
+        self.window_factory = window_factory
+        self.windows = OrderedDict() # key -> visible window, least recently used first
+        self.hidden = [] # windows the user closed, kept for reuse
+        self.content = OrderedDict() # key -> (stamp, text), least recently used first
+        self.created = 0
+
+    def window_for(self, key):
+        window = self.windows.pop(key, None)
+        if window is None:
+            if self.hidden:
+                window = self.hidden.pop()
+            elif len(self.windows) >= self.limit:
+                _, window = self.windows.popitem(last=False)
+            else:
+                window = self.window_factory(self.root, self.close)
+                self.created += 1
+            window.key = key
+            window.stamp = None
+        self.windows[key] = window
+        return window
+
+    def close(self, window):
+        # Hide instead of destroying so the widgets can be reused
+        window.hide()
+        self.windows.pop(window.key, None)
+        window.key = None
+        window.stamp = None
+        self.hidden.append(window)
+
+    def show(self, key, title, lines, empty_text="", page_size=PAGE_SIZE, stamp=None):
+        # Show lines in the window for key; if the window already shows this stamp it is only raised
+        window = self.window_for(key)
+        if stamp is not None and window.stamp == stamp:
+            window.raise_window()
+            return window
+        window.stamp = stamp
+        window.show(title, lines, empty_text, page_size)
+        return window
+
+    def show_text(self, key, title, build, stamp):
+        # Show the text build() returns, reusing the cached text while the stamp is unchanged
+        cached = self.content.pop(key, None)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, build())
+        self.content[key] = cached
+        if len(self.content) > CONTENT_CACHE_LIMIT:
+            self.content.popitem(last=False)
+        return self.show(key, title, [cached[1]], stamp=stamp)
@@ -0,0 +1,258 @@
+import argparse
+import json
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+
+from model import parse_fee
+
+# Consultation intake for several front-desk terminals
+# Terminals connect over a local TCP socket and send one JSON object per line:
+#
+#     {"patient_id": 2003, "doctor_id": 1001, "date": "2024-05-02", "description": "Check-up", "fee": "50"}
+#
+# Each connection is handled on its own thread, which only validates the fields
+# and puts the submission on a bounded queue. A single writer thread takes
+# everything waiting (up to batch_size) and applies it to the model under one
+# write lock, then answers each terminal:
+#
+#     {"ok": true, "consultation_id": 412}
+#     {"ok": false, "error": "Patient or doctor not found."}
+#     {"ok": false, "error": "busy"}
+#
+# "busy" means the queue was full and nothing was recorded; IntakeClient waits a
+# little and sends it again, so a burst slows the terminals down instead of
+# growing the queue without bound.
+
+DEFAULT_ADDRESS = ("127.0.0.1", 8765)
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 100
+REPLY_TIMEOUT = 30.0
+
+
+class IntakeError(Exception):
+    pass
+
+
+class Submission:
+    def __init__(self, patient_id, doctor_id, date, description, fee):
+        self.fields = (patient_id, doctor_id, date, description, fee)
+        self.queued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+
+
+def parse_wire_fee(fee):
+    # A fee on the wire is an amount, whether sent as 50, 49.99 or "50"; parse_fee would
+    # take a bare int as minor units, so the value is always parsed as text
+    if isinstance(fee, bool):
+        raise ValueError(f"Invalid fee: {fee!r}")
+    return parse_fee(str(fee))
+
+
+def parse_submission(line):
+    # Raises ValueError for anything that cannot become a consultation
+    try:
+        data = json.loads(line)
+        return Submission(int(data["patient_id"]), int(data["doctor_id"]), str(data["date"]), str(data["description"]), parse_wire_fee(data["fee"]))
+    except (KeyError, TypeError, json.JSONDecodeError) as error:
+        raise ValueError(f"Malformed submission: {error}") from None
+
+
+class IntakeHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        intake = self.server.intake
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                submission = parse_submission(line)
+            except ValueError as error:
+                self.reply({"ok": False, "error": str(error)})
+                continue
+            if not intake.submit(submission):
+                self.reply({"ok": False, "error": "busy"})
+            elif not submission.done.wait(REPLY_TIMEOUT):
+                self.reply({"ok": False, "error": "timed out"})
+            elif isinstance(submission.result, Exception):
+                self.reply({"ok": False, "error": "Patient or doctor not found." if isinstance(submission.result, KeyError) else str(submission.result)})
+            else:
+                self.reply({"ok": True, "consultation_id": submission.result.consultation_id})
+
+    def reply(self, message):
+        self.wfile.write(json.dumps(message).encode() + b"\n")
+
+
+class IntakeServer:
+    def __init__(self, model, address=DEFAULT_ADDRESS, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE, on_batch=None):
+        self.model = model
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        # on_batch(patient_ids, doctor_ids) runs on the writer thread after each batch
+        self.on_batch = on_batch
+        self.server = socketserver.ThreadingTCPServer(address, IntakeHandler, bind_and_activate=False)
+        self.server.daemon_threads = True
+        self.server.allow_reuse_address = True
+        self.server.intake = self
+        self.threads = []
+        # Counters and a window of recent queue latencies (seconds from queued to applied)
+        self.applied = 0
+        self.rejected = 0
+        self.busy = 0
+        self.batches = 0
+        self.queue_latencies = deque(maxlen=100000)
+        self.busy_lock = threading.Lock() # busy is counted on the connection threads
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def start(self):
+        self.server.server_bind()
+        self.server.server_activate()
+        self.threads = [
+            threading.Thread(target=self.server.serve_forever, name="intake-accept", daemon=True),
+            threading.Thread(target=self._write_loop, name="intake-writer", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        # Stop accepting, let the writer finish what is queued, then close the socket
+        self.server.shutdown()
+        self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def submit(self, submission):
+        # Returns False, without queueing, when the queue is full
+        try:
+            self.queue.put_nowait(submission)
+        except queue.Full:
+            with self.busy_lock:
+                self.busy += 1
+            return False
+        return True
+
+    def _write_loop(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    submission = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if submission is None:
+                    stopping = True
+                    break
+                batch.append(submission)
+            self._apply(batch)
+            if stopping:
+                return
+
+    def _apply(self, batch):
+        results = self.model.add_consultations([submission.fields for submission in batch])
+        applied_at = time.perf_counter()
+        patient_ids = set()
+        doctor_ids = set()
+        for submission, result in zip(batch, results):
+            submission.result = result
+            self.queue_latencies.append(applied_at - submission.queued_at)
+            if isinstance(result, Exception):
+                self.rejected += 1
+            else:
+                self.applied += 1
+                patient_ids.add(result.patient_id)
+                doctor_ids.add(result.doctor_id)
+            submission.done.set()
+        self.batches += 1
+        if self.on_batch and patient_ids:
+            self.on_batch(patient_ids, doctor_ids)
+
+
+class IntakeClient:
+    # Stand-in for a front-desk terminal; one connection, one submission at a time
+    def __init__(self, address=DEFAULT_ADDRESS, retry_delay=0.01, max_retry_delay=0.5, timeout=REPLY_TIMEOUT):
+        self.sock = socket.create_connection(address, timeout=timeout)
+        self.reader = self.sock.makefile("rb")
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.retries = 0
+
+    def submit(self, patient_id, doctor_id, date, description, fee):
+        # Returns the new consultation ID; retries with backoff while the server is busy
+        message = json.dumps({"patient_id": patient_id, "doctor_id": doctor_id, "date": date, "description": description, "fee": fee}).encode() + b"\n"
+        delay = self.retry_delay
+        while True:
+            self.sock.sendall(message)
+            line = self.reader.readline()
+            if not line:
+                raise IntakeError("Connection closed by the intake server")
+            reply = json.loads(line)
+            if reply["ok"]:
+                return reply["consultation_id"]
+            if reply["error"] != "busy":
+                raise IntakeError(reply["error"])
+            self.retries += 1
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parse_address(value):
+    host, _, port = value.rpartition(":")
+    return (host or DEFAULT_ADDRESS[0], int(port))
+
+
+def main(argv=None):
+    from model import MedicalCenterModel
+
+    parser = argparse.ArgumentParser(description="Accept consultations from several terminals over a local socket.")
+    parser.add_argument("--address", type=parse_address, default=DEFAULT_ADDRESS, help="host:port to listen on (default: 127.0.0.1:8765)")
+    parser.add_argument("--doctors", default="Doctor.txt", help="Doctor data file (default: Doctor.txt)")
+    parser.add_argument("--patients", default="Patient.txt", help="Patient data file (default: Patient.txt)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    model = MedicalCenterModel()
+    model.load_doctors_data(args.doctors)
+    model.load_patients_data(args.patients)
+    server = IntakeServer(model, args.address, args.queue_size, args.batch_size).start()
+    print(f"Accepting consultations on {server.address[0]}:{server.address[1]}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"{server.applied} applied, {server.rejected} rejected, {server.busy} busy replies in {server.batches} batches")
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+from collections import deque
+
+# Undo/redo journal
+# Every assign, reassign and consultation made through the journal is kept as a
+# command object that knows how to apply itself and how to apply its inverse.
+# Undo and redo only touch the entities named by the command, and the journal
+# keeps at most `limit` commands so memory stays bounded over a long session.
+#
+# The journal assumes that it sees every change to the links it records; undoing
+# past a change made directly on the model may restore a stale state.
+
+DEFAULT_JOURNAL_LIMIT = 500
+
+
+class AssignCommand:
+    # Assign (or reassign) a patient to a doctor; undo restores the previous doctor
+    name = "assign"
+
+    def __init__(self, patient_id, doctor_id):
+        self.patient_id = patient_id
+        self.doctor_id = doctor_id
+        self.previous_doctor_id = None
+
+    def apply(self, model):
+        patient, doctor, previous_doctor = model.assign_patient_to_doctor(self.patient_id, self.doctor_id)
+        self.previous_doctor_id = previous_doctor.doctor_id if previous_doctor else None
+        return patient, doctor
+
+    def undo(self, model):
+        if self.previous_doctor_id is None:
+            model.unassign_patient(self.patient_id)
+        else:
+            model.assign_patient_to_doctor(self.patient_id, self.previous_doctor_id)
+
+    def touched(self):
+        # IDs of the patients and doctors whose rows may need repainting
+        doctor_ids = [self.doctor_id]
+        if self.previous_doctor_id is not None:
+            doctor_ids.append(self.previous_doctor_id)
+        return [self.patient_id], doctor_ids
+
+    def describe(self):
+        return f"assign patient {self.patient_id} to doctor {self.doctor_id}"
+
+
+class ConsultCommand:
+    # Add a consultation for a patient with a doctor; undo takes the same consultation back off
+    name = "consult"
+
+    def __init__(self, patient_id, doctor_id, date, description, fee):
+        self.patient_id = patient_id
+        self.doctor_id = doctor_id
+        self.date = date
+        self.description = description
+        self.fee = fee
+        self.consultation = None
+
+    def apply(self, model):
+        if self.consultation is None:
+            patient, doctor, self.consultation = model.add_consultation(self.patient_id, self.doctor_id, self.date, self.description, self.fee)
+        else:
+            patient, doctor, consultation = model.attach_consultation(self.patient_id, self.doctor_id, self.consultation)
+        return patient, doctor
+
+    def undo(self, model):
+        model.remove_consultation(self.patient_id, self.doctor_id, self.consultation)
+
+    def touched(self):
+        return [self.patient_id], [self.doctor_id]
+
+    def describe(self):
+        return f"consultation for patient {self.patient_id} with doctor {self.doctor_id}"
+
+
+class Journal:
+    def __init__(self, model, limit=DEFAULT_JOURNAL_LIMIT):
+        self.model = model
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = deque(maxlen=limit)
+
+    def execute(self, command):
+        # Apply a new command; this clears anything that could have been redone
+        result = command.apply(self.model)
+        self.undo_stack.append(command)
+        self.redo_stack.clear()
+        return result
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        # Reverse the most recent command and return it, or None if there is nothing to undo
+        if not self.undo_stack:
+            return None
+        command = self.undo_stack.pop()
+        command.undo(self.model)
+        self.redo_stack.append(command)
+        return command
+
+    def redo(self):
+        # Re-apply the most recently undone command and return it, or None if there is nothing to redo
+        if not self.redo_stack:
+            return None
+        command = self.redo_stack.pop()
+        command.apply(self.model)
+        self.undo_stack.append(command)
+        return command
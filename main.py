@@ -1,163 +1,168 @@
+import argparse
+import queue
+import time
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
-
-# Model
-# Define classes to represent the data structure
-class Doctor:
-    def __init__(self, doctor_id, first_name, last_name, specialisation):
-        # Initialize doctor attributes
-        self.doctor_id = doctor_id
-        self.first_name = first_name
-        self.last_name = last_name
-        self.specialisation = specialisation
-        self.patients = [] # List of assigned patients
-        self.consultations = [] # List of consultations
-
-    def assign_patient(self, patient):
-         # Method to assign a patient to the doctor
-        self.patients.append(patient)
-
-    def add_consultation(self, consultation):
-        # Method to add a consultation to the doctor's record
-        self.consultations.append(consultation)
-
-    def get_info(self):
-        # Method to get doctor's information
-        # This includes doctor ID, name, specialization, list of patients, and list of consultations
-        patient_list = ", ".join([f"{patient.first_name} {patient.last_name}" for patient in self.patients])
-        consultation_list = "\n".join([f"{consultation.date}: {consultation.description} (Fee: {consultation.fee})" for consultation in self.consultations])
-
-        info = f"Doctor Information:\n"
-        info += f"Doctor ID: {self.doctor_id}\n"
-        info += f"Full Name: {self.first_name} {self.last_name}\n"
-        info += f"Specialization: {self.specialisation}\n"
-        info += f"List of Patients: {patient_list}\n"
-        info += f"List of Consultations:\n{consultation_list}"
-
-        return info
-
-class Patient:
-    def __init__(self, patient_id, first_name, last_name):
-        self.patient_id = patient_id
-        self.first_name = first_name
-        self.last_name = last_name
-        self.doctor = None
-        self.consultations = []
-
-    def assign_doctor(self, doctor):
-        self.doctor = doctor
-
-    def add_consultation(self, consultation):
-        self.consultations.append(consultation)
-
-    def get_info(self):
-        doctor_info = self.doctor.get_info() if self.doctor else "No Assigned Doctor"
-        consultation_list = "\n".join([f"{consultation.date}: {consultation.description} (Fee: {consultation.fee})" for consultation in self.consultations])
-
-        info = f"Patient Information:\n"
-        info += f"Patient ID: {self.patient_id}\n"
-        info += f"Full Name: {self.first_name} {self.last_name}\n"
-        info += f"Doctor Information:\n{doctor_info}\n"
-        info += f"List of Consultations:\n{consultation_list}"
-
-        return info
-
-    def get_consultation_report(self):
-        consultation_report = ""
-        for consultation in self.consultations:
-            consultation_report += f"{consultation.date}: {consultation.description} (Fee: {consultation.fee})\n"
-        return consultation_report
-
-class Consultation:
-    def __init__(self, date, description, fee):
-        self.date = date
-        self.description = description
-        self.fee = fee
-
-# Define similar classes for Patient and Consultation
+from datetime import date
+
+# The model classes live in model.py so batch tools can use them without tkinter
+from model import Consultation, Doctor, MedicalCenterModel, Patient, format_fee, parse_fee
+from journal import AssignCommand, ConsultCommand, Journal
+from refresh import RefreshScheduler
+from dedup import iter_duplicate_report
+from query import UNASSIGNED, RosterQuery
+from verify import IncrementalVerifier
+from archive import ConsultationArchive, archive_old_consultations, iter_full_consultation_report
+from workload import WorkloadRecorder
+from infopane import EntityVersions, InfoWindowPool
+from changefeed import ChangeFeed
+from intake import IntakeServer, parse_address
+from triage import DEFAULT_PRIORITY, PRIORITIES, WaitingRoom
+
+# How often consultations past the retention window are moved to the archive
+ARCHIVE_INTERVAL_MS = 60 * 60 * 1000
+
+# Number of report lines rendered per page in the consultation report window
+REPORT_PAGE_SIZE = 50
+
+# How often rows changed by the intake server are repainted
+INTAKE_POLL_MS = 200
 
 # View
 # Create a graphical user interface using tkinter
 class MedicalCenterApp:
-    def __init__(self, root):
+    def __init__(self, root, recorder=None, feed_path=None, intake_address=None):
         self.root = root
         self.root.title("Medical Center Management")
-
-        self.doctors = []
-        self.patients = []
+        # Optional WorkloadRecorder that logs every action for replay (see workload.py)
+        self.recorder = recorder
+
+        self.model = MedicalCenterModel()
+        self.journal = Journal(self.model)
+        self.refresh = RefreshScheduler(self.root)
+        self.archive = ConsultationArchive()
+        self.query = RosterQuery(self.model)
+        self.verifier = IncrementalVerifier(self.model)
+        # Information and report windows are pooled and reused (see infopane.py)
+        self.versions = EntityVersions(self.model)
+        self.info_windows = InfoWindowPool(self.root)
+        self.waiting_room = WaitingRoom(self.model)
+        # Optional change feed for follower processes; attached before loading so it carries the roster
+        self.feed = ChangeFeed(self.model, feed_path) if feed_path else None
+        # Current filter and sort order of each table
+        self.doctor_view = {"specialisation": None, "sort_column": "ID", "descending": False}
+        self.patient_view = {"doctor_id": None, "sort_column": "ID", "descending": False}
+        self.doctors = self.model.doctors
+        self.patients = self.model.patients
 
         self.create_doctor_list_view()
         self.create_patient_list_view()
+        self.create_dashboard_view()
         self.create_assignment_buttons()
-        self.create_consultation_buttons()
-        self.create_info_buttons()
+        # The consultation and information panels are only built when first opened
+        self.create_lazy_panel(2, "Consultations", self.create_consultation_buttons)
+        self.create_lazy_panel(3, "Information", self.create_info_buttons)
+        self.create_lazy_panel(1, "Duplicates", self.create_duplicate_buttons, column=2, columnspan=1)
+        self.create_lazy_panel(2, "Waiting Room", self.create_waiting_room_view, column=2, columnspan=1)
         self.create_search_widgets()
+        self.create_undo_buttons()
+        self.create_filter_widgets()
 
         # Load doctors and patients data from text files
         self.load_doctors_data()
         self.load_patients_data()
+        self.update_doctor_list()
+        self.update_patient_list()
+        self.update_dashboard()
+        self.update_filter_choices()
+
+        # Repaints after actions are batched and applied once per event-loop tick
+        self.refresh.register("doctors", self.update_doctor_list, self.refresh_doctor_rows)
+        self.refresh.register("patients", self.update_patient_list, self.refresh_patient_rows)
+        self.refresh.register("dashboard", self.update_dashboard)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.root.after(ARCHIVE_INTERVAL_MS, self.archive_old_consultations)
+
+        # Optional intake server for other terminals; its writer thread hands the
+        # changed IDs to the event loop, which is the only place widgets are touched
+        self.intake = None
+        self.intake_updates = queue.SimpleQueue()
+        if intake_address:
+            self.intake = IntakeServer(self.model, intake_address, on_batch=lambda patient_ids, doctor_ids: self.intake_updates.put((patient_ids, doctor_ids))).start()
+            self.root.after(INTAKE_POLL_MS, self.apply_intake_updates)
+
+    def close(self):
+        print(f"Table refreshes: {self.refresh.summary()}")
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.intake is not None:
+            self.intake.stop()
+        if self.feed is not None:
+            self.feed.close()
+        self.root.destroy()
+
+    def record(self, action, *args):
+        if self.recorder is not None:
+            self.recorder.record(action, *args)
 
     def create_doctor_list_view(self):
         doctor_frame = ttk.LabelFrame(self.root, text="Doctors")
         doctor_frame.grid(row=0, column=0, padx=10, pady=10, sticky='nsew')
 
         self.doctor_list = ttk.Treeview(doctor_frame, columns=("ID", "Name", "Specialization"), show="headings")
-        self.doctor_list.heading("ID", text="ID", anchor="center")
-        self.doctor_list.heading("Name", text="Name")
-        self.doctor_list.heading("Specialization", text="Specialization")
+        self.doctor_list.heading("ID", text="ID", anchor="center", command=lambda: self.sort_doctor_list("ID"))
+        self.doctor_list.heading("Name", text="Name", command=lambda: self.sort_doctor_list("Name"))
+        self.doctor_list.heading("Specialization", text="Specialization", command=lambda: self.sort_doctor_list("Specialization"))
         self.doctor_list.pack(fill="both", expand=True)
 
-        # Load doctor data from Doctor.txt
-        doctor_dict = {}
-
-        try:
-            with open('Doctor.txt', 'r') as file:
-                data = file.readlines()
-                for i, j in enumerate(data, start=1000):
-                    doctor_dict[i] = j.strip().split(",")
-
-            ids = list(doctor_dict.keys())
-
-            for i in ids:
-                id = i
-                name = str(doctor_dict[i][0]) + " " + str(doctor_dict[i][1])
-                spec = doctor_dict[i][2]
-
-                self.doctor_list.insert("", "end", values=(id, name, spec))
-        except FileNotFoundError:
-            print("Doctor.txt file not found.")
-
     def create_patient_list_view(self):
         # Create a list view for patients
         patient_frame = ttk.LabelFrame(self.root, text="Patients")
         patient_frame.grid(row=0, column=1, padx=10, pady=10, sticky='nsew')
 
         self.patient_list = ttk.Treeview(patient_frame, columns=("ID", "Name", "Assigned Doctor"), show="headings")
-        self.patient_list.heading("ID", text="ID")
-        self.patient_list.heading("Name", text="Name")
-        self.patient_list.heading("Assigned Doctor", text="Assigned Doctor")
+        self.patient_list.heading("ID", text="ID", command=lambda: self.sort_patient_list("ID"))
+        self.patient_list.heading("Name", text="Name", command=lambda: self.sort_patient_list("Name"))
+        self.patient_list.heading("Assigned Doctor", text="Assigned Doctor", command=lambda: self.sort_patient_list("Assigned Doctor"))
         self.patient_list.pack(fill="both", expand=True)
 
-        # Load patient data from Patient.txt
-        patient_dict = {}
+    def create_dashboard_view(self):
+        # Create a workload dashboard; it only reads the model's running aggregates
+        dashboard_frame = ttk.LabelFrame(self.root, text="Workload")
+        dashboard_frame.grid(row=0, column=2, padx=10, pady=10, sticky='nsew')
+
+        self.dashboard = ttk.Treeview(dashboard_frame, columns=("Patients", "Today", "Revenue"), show="tree headings")
+        self.dashboard.heading("#0", text="Specialisation / Doctor")
+        self.dashboard.heading("Patients", text="Patients")
+        self.dashboard.heading("Today", text="Consultations Today")
+        self.dashboard.heading("Revenue", text="Revenue")
+        self.dashboard.column("Patients", width=70, anchor="e")
+        self.dashboard.column("Today", width=130, anchor="e")
+        self.dashboard.column("Revenue", width=90, anchor="e")
+        self.dashboard.pack(fill="both", expand=True)
+
+    def update_dashboard(self):
+        # Update the workload dashboard from the per-doctor and per-specialisation counters
+        stats = self.model.stats
+        today = date.today().isoformat()
+        open_specialisations = {item for item in self.dashboard.get_children() if self.dashboard.item(item, "open")}
+        self.dashboard.delete(*self.dashboard.get_children())
+
+        for doctor in self.model.list_doctors():
+            specialisation = doctor.specialisation
+            if not self.dashboard.exists(specialisation):
+                self.dashboard.insert('', 'end', iid=specialisation, text=specialisation, open=specialisation in open_specialisations, values=(
+                    stats.patients_by_specialisation[specialisation],
+                    stats.consultations_by_specialisation_day[(specialisation, today)],
+                    format_fee(stats.revenue_by_specialisation[specialisation]),
+                ))
+            self.dashboard.insert(specialisation, 'end', text=f"{doctor.first_name} {doctor.last_name}", values=(
+                stats.patients_by_doctor[doctor.doctor_id],
+                stats.consultations_by_doctor_day[(doctor.doctor_id, today)],
+                format_fee(stats.revenue_by_doctor[doctor.doctor_id]),
+            ))
 
-        try:
-            with open('Patient.txt', 'r') as file:
-                data = file.readlines()
-                for i, j in enumerate(data, start=2000):
-                    patient_dict[i] = j.strip().split(",")
-
-            ids = list(patient_dict.keys())
-
-            for i in ids:
-                id = i
-                name = str(patient_dict[i][0]) + " " + str(patient_dict[i][1])
-
-                self.patient_list.insert("", "end", values=(id, name))
-        except FileNotFoundError:
-            print("Patient.txt file not found.")
-    
     def create_search_widgets(self):
          # Create search widgets for searching doctors or patients by name
         search_frame = ttk.LabelFrame(self.root, text="Search")
@@ -171,17 +176,26 @@ class MedicalCenterApp:
 
         self.search_entry.grid(row=0, column=1, padx=5, pady=5)
         self.search_button.grid(row=0, column=2, padx=5, pady=5)
+
+        # The same box can instead query consultation descriptions, e.g. "asthma OR wheez*"
+        self.search_mode_var = tk.StringVar(value="names")
+        ttk.Radiobutton(search_frame, text="Names", variable=self.search_mode_var, value="names").grid(row=0, column=3, padx=5, pady=5)
+        ttk.Radiobutton(search_frame, text="Search consultations", variable=self.search_mode_var, value="consultations").grid(row=0, column=4, padx=5, pady=5)
     
       
     def search(self):
         # Implement search functionality
+        if self.search_mode_var.get() == "consultations":
+            self.search_consultations()
+            return
+        self.record("search", self.search_var.get())
         search_text = self.search_var.get().strip().lower()
 
         if not search_text:
             return
 
-        matching_doctors = [doctor for doctor in self.doctors if search_text in f"{doctor.first_name} {doctor.last_name}".lower()]
-        matching_patients = [patient for patient in self.patients if search_text in f"{patient.first_name} {patient.last_name}".lower()]
+        matching_doctors = [doctor for doctor in self.model.list_doctors() if search_text in f"{doctor.first_name} {doctor.last_name}".lower()]
+        matching_patients = [patient for patient in self.model.list_patients() if search_text in f"{patient.first_name} {patient.last_name}".lower()]
 
         if matching_doctors and matching_patients:
             messagebox.showinfo("Search Result", "Matching doctors and patients found.")
@@ -193,24 +207,131 @@ class MedicalCenterApp:
         self.update_doctor_list(matching_doctors)
         self.update_patient_list(matching_patients)
 
+    def search_consultations(self):
+        # List the consultations whose description matches the query, using the full-text index
+        query = self.search_var.get()
+        self.record("search_consultations", query)
+        if not query.strip():
+            return
+        consultations = self.model.search_consultations(query)
+
+        def lines():
+            for consultation in consultations:
+                patient = self.model.patients_by_id.get(consultation.patient_id)
+                name = f"{patient.first_name} {patient.last_name}" if patient else "Unknown patient"
+                yield f"{consultation.patient_id} {name} (Doctor {consultation.doctor_id}) - {consultation}\n"
+
+        self.display_report(f"Consultations matching: {query.strip()}", lines(), empty_text="No matching consultations found.")
+
 
         
     def update_doctor_list(self, doctors=None):
         # Update the doctor list in the view
         self.doctor_list.delete(*self.doctor_list.get_children())
-        doctors_to_display = doctors if doctors is not None else self.doctors
+        doctors_to_display = doctors if doctors is not None else self.query.doctors(**self.doctor_view)
         for doctor in doctors_to_display:
-            self.doctor_list.insert('', 'end', values=(doctor.doctor_id, f"{doctor.first_name} {doctor.last_name}", doctor.specialisation))
+            self.doctor_list.insert('', 'end', iid=str(doctor.doctor_id), values=self.doctor_row(doctor))
 
 # Modify the update_patient_list method
     def update_patient_list(self, patients=None):
         # Update the patient list in the view
         self.patient_list.delete(*self.patient_list.get_children())
-        patients_to_display = patients if patients is not None else self.patients
-        for patient in patients_to_display:
-            assigned_doctor = patient.doctor.get_info() if patient.doctor else "No Assigned Doctor"
-            self.patient_list.insert('', 'end', values=(patient.patient_id, f"{patient.first_name} {patient.last_name}", assigned_doctor))
-    
+        patients_to_display = patients if patients is not None else self.query.patients(**self.patient_view)
+        with self.model.lock.read_locked():
+            for patient in patients_to_display:
+                self.patient_list.insert('', 'end', iid=str(patient.patient_id), values=self.patient_row(patient))
+
+    def doctor_row(self, doctor):
+        return (doctor.doctor_id, f"{doctor.first_name} {doctor.last_name}", doctor.specialisation)
+
+    def patient_row(self, patient):
+        assigned_doctor = f"{patient.doctor.first_name} {patient.doctor.last_name}" if patient.doctor else "No Assigned Doctor"
+        return (patient.patient_id, f"{patient.first_name} {patient.last_name}", assigned_doctor)
+
+    def refresh_patient_rows(self, patient_ids):
+        # Repaint only the given rows; rows hidden by a search are left alone
+        with self.model.lock.read_locked():
+            for patient_id in patient_ids:
+                if self.patient_list.exists(str(patient_id)):
+                    self.patient_list.item(str(patient_id), values=self.patient_row(self.model.patients_by_id[patient_id]))
+
+    def refresh_doctor_rows(self, doctor_ids):
+        with self.model.lock.read_locked():
+            for doctor_id in doctor_ids:
+                if self.doctor_list.exists(str(doctor_id)):
+                    self.doctor_list.item(str(doctor_id), values=self.doctor_row(self.model.doctors_by_id[doctor_id]))
+
+    def refresh_rows(self, patient_ids=(), doctor_ids=()):
+        # Mark rows dirty; they are repainted together once the event loop is idle
+        # When the patient table is filtered by doctor or sorted by doctor an
+        # assignment can move rows, so the (filtered) table is rebuilt instead
+        if patient_ids and (self.patient_view["doctor_id"] is not None or self.patient_view["sort_column"] == "Assigned Doctor"):
+            self.refresh.mark_dirty("patients")
+        elif patient_ids:
+            self.refresh.mark_dirty("patients", patient_ids)
+        if doctor_ids:
+            self.refresh.mark_dirty("doctors", doctor_ids)
+        self.refresh.mark_dirty("dashboard")
+        # A reassignment moves a waiting patient to their new doctor's queue
+        if "waiting" in self.refresh.views:
+            self.refresh.mark_dirty("waiting")
+
+
+    def create_filter_widgets(self):
+        # Create filter widgets for narrowing the doctor and patient tables
+        filter_frame = ttk.LabelFrame(self.root, text="Filter")
+        filter_frame.grid(row=6, column=0, columnspan=2, padx=10, pady=10, sticky='nsew')
+
+        ttk.Label(filter_frame, text="Specialization:").grid(row=0, column=0, padx=5, pady=5)
+        ttk.Label(filter_frame, text="Patients of:").grid(row=0, column=2, padx=5, pady=5)
+
+        self.specialisation_filter_var = tk.StringVar(value="All")
+        self.doctor_filter_var = tk.StringVar(value="All")
+
+        self.specialisation_filter = ttk.Combobox(filter_frame, textvariable=self.specialisation_filter_var, state="readonly")
+        self.doctor_filter = ttk.Combobox(filter_frame, textvariable=self.doctor_filter_var, state="readonly")
+        self.apply_filter_button = ttk.Button(filter_frame, text="Apply", command=self.apply_filters)
+        self.clear_filter_button = ttk.Button(filter_frame, text="Clear", command=self.clear_filters)
+
+        self.specialisation_filter.grid(row=0, column=1, padx=5, pady=5)
+        self.doctor_filter.grid(row=0, column=3, padx=5, pady=5)
+        self.apply_filter_button.grid(row=0, column=4, padx=5, pady=5)
+        self.clear_filter_button.grid(row=0, column=5, padx=5, pady=5)
+
+    def update_filter_choices(self):
+        self.specialisation_filter["values"] = ["All"] + self.query.specialisations()
+        self.doctor_filter["values"] = ["All", "Unassigned"] + [f"{doctor.doctor_id} {doctor.first_name} {doctor.last_name}" for doctor in self.model.list_doctors()]
+
+    def apply_filters(self):
+        specialisation = self.specialisation_filter_var.get()
+        doctor_choice = self.doctor_filter_var.get()
+        self.doctor_view["specialisation"] = None if specialisation == "All" else specialisation
+        if doctor_choice == "All":
+            self.patient_view["doctor_id"] = None
+        elif doctor_choice == "Unassigned":
+            self.patient_view["doctor_id"] = UNASSIGNED
+        else:
+            self.patient_view["doctor_id"] = int(doctor_choice.split()[0])
+        self.update_doctor_list()
+        self.update_patient_list()
+
+    def clear_filters(self):
+        self.specialisation_filter_var.set("All")
+        self.doctor_filter_var.set("All")
+        self.apply_filters()
+
+    def sort_doctor_list(self, column):
+        # Clicking the same heading again reverses the order
+        view = self.doctor_view
+        view["descending"] = not view["descending"] if view["sort_column"] == column else False
+        view["sort_column"] = column
+        self.update_doctor_list()
+
+    def sort_patient_list(self, column):
+        view = self.patient_view
+        view["descending"] = not view["descending"] if view["sort_column"] == column else False
+        view["sort_column"] = column
+        self.update_patient_list()
 
     def create_assignment_buttons(self):
         # Create widgets for assigning patients to doctors
@@ -232,6 +353,17 @@ class MedicalCenterApp:
         self.doctor_id_entry.grid(row=1, column=3, padx=5, pady=5)
         self.assign_button.grid(row=1, column=4, padx=5, pady=5)
 
+    def create_lazy_panel(self, row, text, builder, column=0, columnspan=2):
+        # Show a button in place of a panel and build the real widgets the first time it is used
+        placeholder = ttk.LabelFrame(self.root, text=text)
+        placeholder.grid(row=row, column=column, columnspan=columnspan, padx=10, pady=10, sticky='nsew')
+
+        def open_panel():
+            placeholder.destroy()
+            builder()
+
+        ttk.Button(placeholder, text=f"Open {text}", command=open_panel).grid(row=0, column=0, padx=5, pady=5)
+
     def create_consultation_buttons(self):
         # Create widgets for adding consultations
         consultation_frame = ttk.LabelFrame(self.root, text="Consultations")
@@ -278,50 +410,43 @@ class MedicalCenterApp:
         self.view_doctor_button = ttk.Button(info_frame, text="View Doctor Info", command=self.view_doctor_info)
         self.view_patient_button = ttk.Button(info_frame, text="View Patient Info", command=self.view_patient_info)
         self.view_consultation_button = ttk.Button(info_frame, text="View Consultation Report", command=self.view_consultation_report)
+        self.view_history_button = ttk.Button(info_frame, text="View Full History", command=self.view_full_history)
 
         self.info_id_entry.grid(row=1, column=1, padx=5, pady=5)
         self.view_doctor_button.grid(row=1, column=2, padx=5, pady=5)
         self.view_patient_button.grid(row=1, column=3, padx=5, pady=5)
         self.view_consultation_button.grid(row=1, column=4, padx=5, pady=5)
+        self.view_history_button.grid(row=1, column=5, padx=5, pady=5)
+
+        # Consultations between the patient in the ID field and one doctor
+        ttk.Label(info_frame, text="With Doctor ID:").grid(row=2, column=0, padx=5, pady=5)
+        self.info_doctor_id_var = tk.StringVar()
+        self.info_doctor_id_entry = ttk.Entry(info_frame, textvariable=self.info_doctor_id_var)
+        self.view_shared_history_button = ttk.Button(info_frame, text="View History With Doctor", command=self.view_history_with_doctor)
+        self.info_doctor_id_entry.grid(row=2, column=1, padx=5, pady=5)
+        self.view_shared_history_button.grid(row=2, column=2, padx=5, pady=5)
 
     def load_doctors_data(self):
     # Load doctor data from a text file (Doctor.txt)
-        try:
-            with open('Doctor.txt', 'r') as file:
-                data = file.readlines()
-                for i, j in enumerate(data, start=1000):
-                    doctor_data = j.strip().split(",")
-                    doctor = Doctor(int(i), *doctor_data)
-                    self.doctors.append(doctor)
-        except FileNotFoundError:
-            print("Doctor.txt file not found.")
+        self.model.load_doctors_data()
 
     def load_patients_data(self):
     # Load patient data from a text file (Patient.txt)
-        try:
-            with open('Patient.txt', 'r') as file:
-                data = file.readlines()
-                for i, j in enumerate(data, start=2000):
-                    patient_data = j.strip().split(",")
-                    patient = Patient(int(i), *patient_data)
-                    self.patients.append(patient)
-        except FileNotFoundError:
-            print("Patient.txt file not found.")
+        self.model.load_patients_data()
 
     def assign_patient_to_doctor(self):
     # Implement patient assignment to a doctor
         patient_id = self.patient_id_var.get()
         doctor_id = self.doctor_id_var.get()
+        self.record("assign", patient_id, doctor_id)
 
         try:
-            patient = next(patient for patient in self.patients if patient.patient_id == int(patient_id))
-            doctor = next(doctor for doctor in self.doctors if doctor.doctor_id == int(doctor_id))
-            patient.assign_doctor(doctor)
-            doctor.assign_patient(patient)
-            self.update_patient_list()
-            self.update_doctor_list()
+            command = AssignCommand(int(patient_id), int(doctor_id))
+            patient, doctor = self.journal.execute(command)
+            self.refresh_rows(*command.touched())
+            self.report_violations()
             messagebox.showinfo("Assignment", f"Patient {patient.first_name} {patient.last_name} assigned to Doctor {doctor.first_name} {doctor.last_name}.")
-        except StopIteration:
+        except (KeyError, ValueError):
             messagebox.showerror("Error", "Patient or doctor not found.")
 
     def add_consultation(self):
@@ -331,70 +456,337 @@ class MedicalCenterApp:
         date = self.consultation_date_var.get()
         description = self.consultation_description_var.get()
         fee = self.consultation_fee_var.get()
+        self.record("consult", patient_id, doctor_id, date, description, fee)
+
+        try:
+            fee = parse_fee(fee)
+        except ValueError:
+            messagebox.showerror("Error", "Fee must be an amount such as 50 or 49.99.")
+            return
 
         try:
-            patient = next(patient for patient in self.patients if patient.patient_id == int(patient_id))
-            doctor = next(doctor for doctor in self.doctors if doctor.doctor_id == int(doctor_id))
-            consultation = Consultation(date, description, fee)
-            patient.add_consultation(consultation)
-            doctor.add_consultation(consultation)
-            self.update_patient_list()
-            self.update_doctor_list()
+            command = ConsultCommand(int(patient_id), int(doctor_id), date, description, fee)
+            patient, doctor = self.journal.execute(command)
+            self.refresh_rows(*command.touched())
+            self.report_violations()
             messagebox.showinfo("Consultation", f"Consultation added for Patient {patient.first_name} {patient.last_name} with Doctor {doctor.first_name} {doctor.last_name}.")
-        except StopIteration:
+        except (KeyError, ValueError):
             messagebox.showerror("Error", "Patient or doctor not found.")
 
+    def report_violations(self):
+    # Warn about any inconsistency the incremental verifier found in the last action
+        violations = self.verifier.take()
+        if violations:
+            messagebox.showwarning("Check", "\n\n".join(f"{violation.message}.\nSuggested fix: {violation.repair}." for violation in violations))
+
+    def create_undo_buttons(self):
+        # Create undo/redo buttons for assignments and consultations
+        undo_frame = ttk.Frame(self.root)
+        undo_frame.grid(row=5, column=0, columnspan=2, padx=10, pady=5, sticky='w')
+
+        self.undo_button = ttk.Button(undo_frame, text="Undo", command=self.undo_last_action)
+        self.redo_button = ttk.Button(undo_frame, text="Redo", command=self.redo_last_action)
+        self.undo_button.grid(row=0, column=0, padx=5)
+        self.redo_button.grid(row=0, column=1, padx=5)
+
+        self.root.bind("<Control-z>", lambda event: self.undo_last_action())
+        self.root.bind("<Control-y>", lambda event: self.redo_last_action())
+
+    def undo_last_action(self):
+    # Reverse the last assignment or consultation
+        self.record("undo")
+        command = self.journal.undo()
+        if command is None:
+            messagebox.showinfo("Undo", "Nothing to undo.")
+            return
+        self.refresh_rows(*command.touched())
+
+    def redo_last_action(self):
+    # Re-apply the last undone assignment or consultation
+        self.record("redo")
+        command = self.journal.redo()
+        if command is None:
+            messagebox.showinfo("Redo", "Nothing to redo.")
+            return
+        self.refresh_rows(*command.touched())
+
+    def create_duplicate_buttons(self):
+        # Create widgets for reviewing and merging duplicate patient records
+        duplicate_frame = ttk.LabelFrame(self.root, text="Duplicates")
+        duplicate_frame.grid(row=1, column=2, padx=10, pady=10, sticky='nsew')
+
+        ttk.Label(duplicate_frame, text="Keep ID:").grid(row=0, column=0, padx=5, pady=5)
+        ttk.Label(duplicate_frame, text="Duplicate ID:").grid(row=1, column=0, padx=5, pady=5)
+
+        self.keep_id_var = tk.StringVar()
+        self.duplicate_id_var = tk.StringVar()
+
+        self.keep_id_entry = ttk.Entry(duplicate_frame, textvariable=self.keep_id_var, width=10)
+        self.duplicate_id_entry = ttk.Entry(duplicate_frame, textvariable=self.duplicate_id_var, width=10)
+        self.duplicate_report_button = ttk.Button(duplicate_frame, text="Duplicate Report", command=self.view_duplicate_report)
+        self.merge_button = ttk.Button(duplicate_frame, text="Merge", command=self.merge_patients)
+
+        self.keep_id_entry.grid(row=0, column=1, padx=5, pady=5)
+        self.duplicate_id_entry.grid(row=1, column=1, padx=5, pady=5)
+        self.duplicate_report_button.grid(row=2, column=0, padx=5, pady=5)
+        self.merge_button.grid(row=2, column=1, padx=5, pady=5)
+
+    def create_waiting_room_view(self):
+        # Create the waiting-room queues and the widgets for triage
+        waiting_frame = ttk.LabelFrame(self.root, text="Waiting Room")
+        waiting_frame.grid(row=2, column=2, rowspan=2, padx=10, pady=10, sticky='nsew')
+
+        self.waiting_list = ttk.Treeview(waiting_frame, columns=("Priority", "Arrived"), show="tree headings", height=8)
+        self.waiting_list.heading("#0", text="Doctor / Patient")
+        self.waiting_list.heading("Priority", text="Priority")
+        self.waiting_list.heading("Arrived", text="Arrived")
+        self.waiting_list.column("Priority", width=90)
+        self.waiting_list.column("Arrived", width=60, anchor="center")
+        self.waiting_list.grid(row=0, column=0, columnspan=4, padx=5, pady=5, sticky='nsew')
+
+        ttk.Label(waiting_frame, text="Patient ID:").grid(row=1, column=0, padx=5, pady=5)
+        ttk.Label(waiting_frame, text="Priority:").grid(row=1, column=2, padx=5, pady=5)
+        ttk.Label(waiting_frame, text="Doctor ID:").grid(row=2, column=0, padx=5, pady=5)
+        ttk.Label(waiting_frame, text="Specialization:").grid(row=2, column=2, padx=5, pady=5)
+        ttk.Label(waiting_frame, text="Description:").grid(row=3, column=0, padx=5, pady=5)
+        ttk.Label(waiting_frame, text="Fee:").grid(row=3, column=2, padx=5, pady=5)
+
+        self.waiting_patient_id_var = tk.StringVar()
+        self.waiting_priority_var = tk.StringVar(value=f"{DEFAULT_PRIORITY} {PRIORITIES[DEFAULT_PRIORITY]}")
+        self.waiting_doctor_id_var = tk.StringVar()
+        self.waiting_specialisation_var = tk.StringVar()
+        self.waiting_description_var = tk.StringVar()
+        self.waiting_fee_var = tk.StringVar()
+
+        ttk.Entry(waiting_frame, textvariable=self.waiting_patient_id_var, width=10).grid(row=1, column=1, padx=5, pady=5)
+        ttk.Combobox(waiting_frame, textvariable=self.waiting_priority_var, state="readonly", width=12, values=[f"{priority} {name}" for priority, name in sorted(PRIORITIES.items())]).grid(row=1, column=3, padx=5, pady=5)
+        ttk.Entry(waiting_frame, textvariable=self.waiting_doctor_id_var, width=10).grid(row=2, column=1, padx=5, pady=5)
+        ttk.Combobox(waiting_frame, textvariable=self.waiting_specialisation_var, state="readonly", width=12, values=self.query.specialisations()).grid(row=2, column=3, padx=5, pady=5)
+        ttk.Entry(waiting_frame, textvariable=self.waiting_description_var, width=10).grid(row=3, column=1, padx=5, pady=5)
+        ttk.Entry(waiting_frame, textvariable=self.waiting_fee_var, width=10).grid(row=3, column=3, padx=5, pady=5)
+
+        ttk.Button(waiting_frame, text="Add to Queue", command=self.enqueue_patient).grid(row=4, column=0, padx=5, pady=5)
+        ttk.Button(waiting_frame, text="Set Priority", command=self.bump_patient).grid(row=4, column=1, padx=5, pady=5)
+        ttk.Button(waiting_frame, text="Call Next for Doctor", command=self.call_next_for_doctor).grid(row=4, column=2, padx=5, pady=5)
+        ttk.Button(waiting_frame, text="Call Next for Specialization", command=self.call_next_for_specialisation).grid(row=4, column=3, padx=5, pady=5)
+        ttk.Button(waiting_frame, text="Doctor Is Free", command=self.free_doctor).grid(row=5, column=2, padx=5, pady=5)
+
+        self.refresh.register("waiting", self.update_waiting_list)
+        self.update_waiting_list()
+
+    def update_waiting_list(self):
+        # Show each doctor's queue in calling order, and which doctors are busy
+        self.waiting_list.delete(*self.waiting_list.get_children())
+        for doctor in self.model.list_doctors():
+            waiting = self.waiting_room.waiting(doctor.doctor_id)
+            busy = self.waiting_room.is_busy(doctor.doctor_id)
+            if not waiting and not busy:
+                continue
+            state = ", busy" if busy else ""
+            parent = self.waiting_list.insert('', 'end', text=f"{doctor.first_name} {doctor.last_name} ({len(waiting)}{state})", open=True)
+            for patient_id, priority, arrived_at in waiting:
+                patient = self.model.patients_by_id.get(patient_id)
+                name = f"{patient.first_name} {patient.last_name}" if patient else ""
+                self.waiting_list.insert(parent, 'end', text=f"{patient_id} {name}", values=(PRIORITIES[priority], time.strftime("%H:%M", time.localtime(arrived_at))))
+
+    def enqueue_patient(self):
+    # Put a patient in their doctor's waiting queue (or the doctor given)
+        patient_id = self.waiting_patient_id_var.get()
+        doctor_id = self.waiting_doctor_id_var.get().strip()
+        self.record("enqueue", patient_id, self.waiting_priority_var.get(), doctor_id)
+        try:
+            priority = int(self.waiting_priority_var.get().split()[0])
+            self.waiting_room.enqueue(int(patient_id), priority, int(doctor_id) if doctor_id else None)
+        except KeyError:
+            messagebox.showerror("Error", "Patient or doctor not found.")
+            return
+        except ValueError:
+            messagebox.showerror("Error", "Enter a patient ID, and a doctor ID if the patient has no assigned doctor.")
+            return
+        self.refresh.mark_dirty("waiting")
+
+    def bump_patient(self):
+    # Change the priority of a waiting patient
+        patient_id = self.waiting_patient_id_var.get()
+        self.record("bump", patient_id, self.waiting_priority_var.get())
+        try:
+            self.waiting_room.bump(int(patient_id), int(self.waiting_priority_var.get().split()[0]))
+        except (KeyError, ValueError):
+            messagebox.showerror("Error", "That patient is not waiting.")
+            return
+        self.refresh.mark_dirty("waiting")
+
+    def call_next_for_doctor(self):
+    # Call the next patient for one doctor
+        doctor_id = self.waiting_doctor_id_var.get()
+        try:
+            self.call_next(int(doctor_id))
+        except (KeyError, ValueError):
+            messagebox.showerror("Error", "Doctor not found.")
+
+    def call_next_for_specialisation(self):
+    # Call the most urgent patient waiting for any free doctor of a specialisation
+        choice = self.waiting_room.next_for_specialisation(self.waiting_specialisation_var.get())
+        if choice is None:
+            messagebox.showinfo("Waiting Room", "Nobody is waiting for a free doctor of that specialization.")
+            return
+        self.call_next(choice[0])
+
+    def free_doctor(self):
+    # Mark a doctor free again once they have finished with the patient they called
+        doctor_id = self.waiting_doctor_id_var.get()
+        self.record("free_doctor", doctor_id)
+        try:
+            freed = self.waiting_room.free(int(doctor_id))
+        except (KeyError, ValueError):
+            messagebox.showerror("Error", "Doctor not found.")
+            return
+        if not freed:
+            messagebox.showinfo("Waiting Room", "That doctor is not busy.")
+            return
+        self.refresh.mark_dirty("waiting")
+
+    def call_next(self, doctor_id):
+        # Take the next patient off the doctor's queue and record their consultation for today
+        # The consultation goes through the journal, so Undo takes it back like any other
+        today = date.today().isoformat()
+        description = self.waiting_description_var.get()
+        fee = self.waiting_fee_var.get()
+        self.record("call_next", doctor_id, today, description, fee)
+        try:
+            called = self.waiting_room.dequeue(doctor_id, today, description, fee, self.journal)
+        except ValueError:
+            messagebox.showerror("Error", "Fee must be an amount such as 50 or 49.99.")
+            return
+        if called is None:
+            messagebox.showinfo("Waiting Room", "Nobody is waiting for that doctor.")
+            return
+        patient, doctor, command = called
+        self.refresh_rows(*command.touched())
+        self.report_violations()
+        messagebox.showinfo("Waiting Room", f"Call Patient {patient.first_name} {patient.last_name} to Doctor {doctor.first_name} {doctor.last_name}.")
+
+    def view_duplicate_report(self):
+    # Display the patients that are probably the same person
+        self.display_report("Duplicate Patients", iter_duplicate_report(self.model), empty_text="No duplicate patients found.")
+
+    def merge_patients(self):
+    # Fold a duplicate patient into the record being kept
+        keep_id = self.keep_id_var.get()
+        duplicate_id = self.duplicate_id_var.get()
+        self.record("merge", keep_id, duplicate_id)
+
+        try:
+            keep, duplicate = self.model.merge_patients(int(keep_id), int(duplicate_id))
+        except (KeyError, ValueError):
+            messagebox.showerror("Error", "Enter two different existing patient IDs.")
+            return
+        # Journal entries may refer to the removed record, so they can no longer be undone
+        self.journal.clear()
+        self.refresh.mark_dirty("patients")
+        self.refresh.mark_dirty("dashboard")
+        messagebox.showinfo("Merge", f"Patient {duplicate.patient_id} merged into Patient {keep.patient_id} {keep.first_name} {keep.last_name}.")
+
     def view_doctor_info(self):
     # Display doctor information in a separate window
         doctor_id = self.info_id_var.get()
+        self.record("view_doctor", doctor_id)
         try:
-            doctor = next(doctor for doctor in self.doctors if doctor.doctor_id == int(doctor_id))
-            info = doctor.get_info()
-            self.display_info(info)
-        except StopIteration:
+            doctor = self.model.get_doctor(int(doctor_id))
+            self.display_info(("doctor", doctor.doctor_id), f"Doctor {doctor.first_name} {doctor.last_name}", self.versions.doctor_stamp, doctor)
+        except (KeyError, ValueError):
             messagebox.showerror("Error", "Doctor not found.")
 
     def view_patient_info(self):
     # Display patient information in a separate window
         patient_id = self.info_id_var.get()
+        self.record("view_patient", patient_id)
         try:
-            patient = next(patient for patient in self.patients if patient.patient_id == int(patient_id))
-            info = patient.get_info()
-            self.display_info(info)
-        except StopIteration:
+            patient = self.model.get_patient(int(patient_id))
+            self.display_info(("patient", patient.patient_id), f"Patient {patient.first_name} {patient.last_name}", self.versions.patient_stamp, patient)
+        except (KeyError, ValueError):
             messagebox.showerror("Error", "Patient not found.")
 
     def view_consultation_report(self):
     # Display consultation report for a patient in a separate window
         patient_id = self.info_id_var.get()
+        self.record("view_report", patient_id)
         try:
-            patient = next(patient for patient in self.patients if patient.patient_id == int(patient_id))
-            consultation_report = patient.get_consultation_report()
-            self.display_info(consultation_report)
-        except StopIteration:
+            patient = self.model.get_patient(int(patient_id))
+            self.display_report(f"Consultation Report: {patient.first_name} {patient.last_name}", patient.iter_consultation_report(), key=("report", patient.patient_id), stamp=self.versions.patient_stamp(patient))
+        except (KeyError, ValueError):
             messagebox.showerror("Error", "Patient not found.")
 
-    def display_info(self, info):
-    # Display information in a separate window
-        info_window = tk.Toplevel(self.root)
-        info_window.title("Information")
-        info_label = ttk.Label(info_window, text=info, wraplength=400)
-        info_label.pack(padx=10, pady=10)
+    def view_full_history(self):
+    # Display every consultation for a patient, including archived ones, in a separate window
+        patient_id = self.info_id_var.get()
+        self.record("view_history", patient_id)
+        try:
+            patient = self.model.get_patient(int(patient_id))
+            self.display_report(f"Full History: {patient.first_name} {patient.last_name}", iter_full_consultation_report(patient, self.archive, self.model.merged_patient_ids(patient.patient_id)), key=("history", patient.patient_id), stamp=self.versions.patient_stamp(patient))
+        except (KeyError, ValueError):
+            messagebox.showerror("Error", "Patient not found.")
 
-    def update_doctor_list(self):
-    # Update the doctor list in the view
-        self.doctor_list.delete(*self.doctor_list.get_children())
-        for doctor in self.doctors:
-            self.doctor_list.insert('', 'end', values=(doctor.doctor_id, f"{doctor.first_name} {doctor.last_name}", doctor.specialisation))
+    def view_history_with_doctor(self):
+    # Display what one doctor has seen a patient for, read from the doctor/patient index
+        patient_id = self.info_id_var.get()
+        doctor_id = self.info_doctor_id_var.get()
+        self.record("view_history_with", patient_id, doctor_id)
+        try:
+            patient = self.model.get_patient(int(patient_id))
+            doctor = self.model.get_doctor(int(doctor_id))
+            consultations = self.model.consultations_between(doctor.doctor_id, patient.patient_id)
+            self.display_report(f"History: {patient.first_name} {patient.last_name} with Doctor {doctor.first_name} {doctor.last_name}", (f"{consultation}\n" for consultation in consultations))
+        except (KeyError, ValueError):
+            messagebox.showerror("Error", "Patient or doctor not found.")
 
-    def update_patient_list(self):
-    # Update the patient list in the view
-        self.patient_list.delete(*self.patient_list.get_children())
-        for patient in self.patients:
-            assigned_doctor = patient.doctor.get_info() if patient.doctor else "No Assigned Doctor"
-            self.patient_list.insert('', 'end', values=(patient.patient_id, f"{patient.first_name} {patient.last_name}", assigned_doctor))
+    def apply_intake_updates(self):
+    # Repaint the rows touched by consultations that arrived from other terminals
+        patient_ids = set()
+        doctor_ids = set()
+        while True:
+            try:
+                patients, doctors = self.intake_updates.get_nowait()
+            except queue.Empty:
+                break
+            patient_ids.update(patients)
+            doctor_ids.update(doctors)
+        if patient_ids:
+            self.refresh_rows(patient_ids, doctor_ids)
+        self.root.after(INTAKE_POLL_MS, self.apply_intake_updates)
+
+    def archive_old_consultations(self):
+    # Move consultations older than the retention window out of memory, then check again later
+        archived = archive_old_consultations(self.model, self.archive)
+        if archived:
+            # Undo entries may point at consultations that are no longer in memory
+            self.journal.clear()
+        self.root.after(ARCHIVE_INTERVAL_MS, self.archive_old_consultations)
+
+    def display_info(self, key, title, stamp_of, entity):
+    # Display an entity's information in a pooled window; unchanged entities are not re-rendered
+        with self.model.lock.read_locked():
+            stamp = stamp_of(entity)
+
+        def build():
+            with self.model.lock.read_locked():
+                return entity.get_info()
+
+        self.info_windows.show_text(key, title, build, stamp)
+
+    def display_report(self, title, lines, empty_text="No consultations recorded.", page_size=REPORT_PAGE_SIZE, key=None, stamp=None):
+    # Display a report in a pooled, scrollable window, pulling the next page from the
+    # line generator only when the user scrolls near the end of what is shown
+    # Reports with the same key share a window; a matching stamp means it is already up to date
+        self.info_windows.show(key or title, title, lines, empty_text, page_size, stamp)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Medical Center Management")
+    parser.add_argument("--record", metavar="FILE", help="Log every action to FILE for replay with workload.py")
+    parser.add_argument("--feed", metavar="FILE", help="Publish every change to FILE for followers (see changefeed.py)")
+    parser.add_argument("--intake", metavar="[HOST:]PORT", type=parse_address, help="Accept consultations from other terminals (see intake.py)")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = MedicalCenterApp(root)
+    app = MedicalCenterApp(root, recorder=WorkloadRecorder(args.record) if args.record else None, feed_path=args.feed, intake_address=args.intake)
     root.mainloop()
@@ -0,0 +1,498 @@
+from collections import Counter
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+import threading
+import uuid
+
+from dedup import DuplicateIndex
+from textindex import ConsultationIndex
+
+# Model
+# Define classes to represent the data structure
+def remove_latest(items, item):
+    # Remove an item from a list, taking the O(1) path when it is the most recent one
+    if items and items[-1] is item:
+        items.pop()
+    else:
+        items.remove(item)
+
+def parse_fee(fee):
+    # Convert a fee as typed ("50", "49.99", "1,200.00") into integer minor units (pence/cents)
+    # Raises ValueError for anything that is not a non-negative amount with at most two decimals
+    if isinstance(fee, int):
+        if fee < 0:
+            raise ValueError(f"Invalid fee: {fee}")
+        return fee
+    text = str(fee).strip().replace(",", "")
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid fee: {fee!r}") from None
+    if not amount.is_finite() or amount < 0 or amount.as_tuple().exponent < -2:
+        raise ValueError(f"Invalid fee: {fee!r}")
+    return int(amount * 100)
+
+def format_fee(minor_units):
+    return f"{minor_units // 100}.{minor_units % 100:02d}"
+
+class Doctor:
+    def __init__(self, doctor_id, first_name, last_name, specialisation):
+        # Initialize doctor attributes
+        self.doctor_id = doctor_id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.specialisation = specialisation
+        self.patients = [] # List of assigned patients
+        self.consultations = [] # List of consultations
+        self.total_fees = 0 # Running total of consultation fees in minor units
+        self.archived_count = 0 # Consultations moved to the archive (see archive.py)
+
+    def assign_patient(self, patient):
+         # Method to assign a patient to the doctor
+        self.patients.append(patient)
+
+    def remove_patient(self, patient):
+        # Method to remove a patient that has been reassigned to another doctor
+        if patient in self.patients:
+            self.patients.remove(patient)
+
+    def add_consultation(self, consultation):
+        # Method to add a consultation to the doctor's record
+        self.consultations.append(consultation)
+        self.total_fees += consultation.fee
+
+    def remove_consultation(self, consultation):
+        # Method to take a consultation back off the doctor's record
+        remove_latest(self.consultations, consultation)
+        self.total_fees -= consultation.fee
+
+    def iter_info(self):
+        # Method to get doctor's information one piece at a time
+        # This includes doctor ID, name, specialization, list of patients, and list of consultations
+        yield f"Doctor Information:\n"
+        yield f"Doctor ID: {self.doctor_id}\n"
+        yield f"Full Name: {self.first_name} {self.last_name}\n"
+        yield f"Specialization: {self.specialisation}\n"
+        yield f"Total Fees: {format_fee(self.total_fees)}\n"
+        yield f"List of Patients: "
+        separator = ""
+        for patient in self.patients:
+            yield f"{separator}{patient.first_name} {patient.last_name}"
+            separator = ", "
+        yield f"\nList of Consultations:\n"
+        separator = ""
+        for consultation in self.consultations:
+            yield f"{separator}{consultation}"
+            separator = "\n"
+        if self.archived_count:
+            yield f"{separator}({self.archived_count} older consultations archived)"
+
+    def get_info(self):
+        # Method to get doctor's information
+        return "".join(self.iter_info())
+
+class Patient:
+    def __init__(self, patient_id, first_name, last_name):
+        self.patient_id = patient_id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.doctor = None
+        self.consultations = []
+        self.total_fees = 0
+        self.archived_count = 0
+
+    def assign_doctor(self, doctor):
+        self.doctor = doctor
+
+    def add_consultation(self, consultation):
+        self.consultations.append(consultation)
+        self.total_fees += consultation.fee
+
+    def remove_consultation(self, consultation):
+        remove_latest(self.consultations, consultation)
+        self.total_fees -= consultation.fee
+
+    def get_info(self):
+        doctor_info = self.doctor.get_info() if self.doctor else "No Assigned Doctor"
+        consultation_lines = [str(consultation) for consultation in self.consultations]
+        if self.archived_count:
+            consultation_lines.append(f"({self.archived_count} older consultations archived)")
+        consultation_list = "\n".join(consultation_lines)
+
+        info = f"Patient Information:\n"
+        info += f"Patient ID: {self.patient_id}\n"
+        info += f"Full Name: {self.first_name} {self.last_name}\n"
+        info += f"Doctor Information:\n{doctor_info}\n"
+        info += f"Total Fees: {format_fee(self.total_fees)}\n"
+        info += f"List of Consultations:\n{consultation_list}"
+
+        return info
+
+    def iter_consultation_report(self):
+        # Yield the report one line at a time so long histories are never built up front
+        for consultation in self.consultations:
+            yield f"{consultation}\n"
+        if self.archived_count:
+            yield f"({self.archived_count} older consultations archived)\n"
+        if self.consultations or self.archived_count:
+            yield f"Total Fees: {format_fee(self.total_fees)}\n"
+
+    def get_consultation_report(self):
+        return "".join(self.iter_consultation_report())
+
+class Consultation:
+    def __init__(self, date, description, fee, patient_id=None, doctor_id=None):
+        self.date = date
+        self.description = description
+        self.fee = fee # Integer minor units, see parse_fee
+        # Set by the model when the consultation is recorded
+        self.patient_id = patient_id
+        self.doctor_id = doctor_id
+        self.consultation_id = None # Also the consultation's sequence number, see MedicalCenterModel
+
+    def __str__(self):
+        return f"{self.date}: {self.description} (Fee: {format_fee(self.fee)})"
+
+class ReadWriteLock:
+    # Lock that lets many readers in at once but gives a writer exclusive access
+    # Waiting writers block new readers so a steady stream of reads cannot starve them
+    # The lock is not reentrant: do not take it again while already holding it
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+class WorkloadStats:
+    # Running counters and sums keyed by doctor ID and by specialisation
+    # The model updates them in O(1) as part of every assignment and consultation,
+    # so dashboards can read them without walking patient or consultation lists
+    def __init__(self):
+        self.patients_by_doctor = Counter()
+        self.patients_by_specialisation = Counter()
+        self.consultations_by_doctor_day = Counter() # (doctor_id, date) -> count
+        self.consultations_by_specialisation_day = Counter() # (specialisation, date) -> count
+        self.revenue_by_doctor = Counter() # minor units
+        self.revenue_by_specialisation = Counter() # minor units
+
+    def patient_assigned(self, doctor):
+        self.patients_by_doctor[doctor.doctor_id] += 1
+        self.patients_by_specialisation[doctor.specialisation] += 1
+
+    def patient_unassigned(self, doctor):
+        self.patients_by_doctor[doctor.doctor_id] -= 1
+        self.patients_by_specialisation[doctor.specialisation] -= 1
+
+    def consultation_added(self, doctor, consultation, sign=1):
+        self.consultations_by_doctor_day[(doctor.doctor_id, consultation.date)] += sign
+        self.consultations_by_specialisation_day[(doctor.specialisation, consultation.date)] += sign
+        self.revenue_by_doctor[doctor.doctor_id] += sign * consultation.fee
+        self.revenue_by_specialisation[doctor.specialisation] += sign * consultation.fee
+
+    def consultation_removed(self, doctor, consultation):
+        self.consultation_added(doctor, consultation, sign=-1)
+
+class MedicalCenterModel:
+    # All changes to doctors, patients and their links go through this class so they
+    # happen under one readers-writer lock; readers that walk Doctor.patients or the
+    # consultation lists of an entity should hold self.lock.read_locked()
+    def __init__(self):
+        self.lock = ReadWriteLock()
+        self.doctors = []
+        self.patients = []
+        self.doctors_by_id = {}
+        self.patients_by_id = {}
+        self.stats = WorkloadStats()
+        self.duplicates = DuplicateIndex()
+        # Secondary indexes for filtering; doctor -> patients is Doctor.patients itself
+        self.doctors_by_specialisation = {}
+        self.unassigned_patients = {} # patient_id -> patient, in insertion order
+        self.consultations_by_pair = {} # (doctor_id, patient_id) -> consultations, oldest first
+        self.consultations_by_id = {}
+        self.descriptions = ConsultationIndex()
+        # Archived records keep the patient ID they were written with, so a merged
+        # duplicate's ID stays listed under the patient it was merged into
+        self.merged_ids = {} # kept patient_id -> IDs of the patients merged into it
+        # Consultation IDs are handed out in increasing order, so they double as sequence
+        # numbers; they start again at 1 in every run, which session_id tells apart
+        self.next_consultation_id = 1
+        self.session_id = uuid.uuid4().hex
+        # Bumped on every change so cached sort orders know when they are stale
+        self.roster_version = 0
+        self.assignment_version = 0
+        self.listeners = []
+
+    def add_listener(self, listener):
+        # listener(event, details) is called after every change, while the write lock is
+        # still held, so it sees a consistent model; it must not take the lock itself
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def notify(self, event, **details):
+        for listener in self.listeners:
+            listener(event, details)
+
+    def add_doctor(self, doctor):
+        with self.lock.write_locked():
+            self.doctors.append(doctor)
+            self.doctors_by_id[doctor.doctor_id] = doctor
+            self.doctors_by_specialisation.setdefault(doctor.specialisation, []).append(doctor)
+            self.roster_version += 1
+            self.notify("add_doctor", doctor=doctor)
+
+    def add_patient(self, patient):
+        # Returns the IDs of existing patients that may be the same person
+        with self.lock.write_locked():
+            self.patients.append(patient)
+            self.patients_by_id[patient.patient_id] = patient
+            if patient.doctor is None:
+                self.unassigned_patients[patient.patient_id] = patient
+            self.roster_version += 1
+            candidates = self.duplicates.add(patient)
+            self.notify("add_patient", patient=patient)
+            return candidates
+
+    def _link(self, patient, doctor):
+        # Caller holds the write lock and has already unlinked any previous doctor
+        patient.assign_doctor(doctor)
+        doctor.assign_patient(patient)
+        self.unassigned_patients.pop(patient.patient_id, None)
+        self.stats.patient_assigned(doctor)
+        self.assignment_version += 1
+
+    def _unlink(self, patient):
+        # Caller holds the write lock; returns the doctor the patient had, if any
+        previous_doctor = patient.doctor
+        if previous_doctor is not None:
+            previous_doctor.remove_patient(patient)
+            patient.assign_doctor(None)
+            self.unassigned_patients[patient.patient_id] = patient
+            self.stats.patient_unassigned(previous_doctor)
+            self.assignment_version += 1
+        return previous_doctor
+
+    def merge_patients(self, keep_id, duplicate_id):
+        # Fold a duplicate patient record into the one being kept and drop the duplicate
+        # Consultations, archived ones included, move to the kept patient; the kept
+        # patient inherits the duplicate's doctor only if they have none of their own
+        with self.lock.write_locked():
+            if keep_id == duplicate_id:
+                raise ValueError("Cannot merge a patient with itself.")
+            keep = self.patients_by_id[keep_id]
+            duplicate = self.patients_by_id[duplicate_id]
+
+            for consultation in duplicate.consultations:
+                self._unindex_consultation(consultation)
+                consultation.patient_id = keep_id
+                self._index_consultation(consultation)
+            keep.consultations.extend(duplicate.consultations)
+            keep.total_fees += duplicate.total_fees
+            keep.archived_count += duplicate.archived_count
+            duplicate.consultations = []
+            duplicate.total_fees = 0
+            duplicate.archived_count = 0
+            self.merged_ids.setdefault(keep_id, []).extend([duplicate_id, *self.merged_ids.pop(duplicate_id, [])])
+
+            previous_doctor = self._unlink(duplicate)
+            if previous_doctor is not None and keep.doctor is None:
+                self._link(keep, previous_doctor)
+
+            self.patients.remove(duplicate)
+            del self.patients_by_id[duplicate_id]
+            self.unassigned_patients.pop(duplicate_id, None)
+            self.duplicates.remove(duplicate)
+            self.roster_version += 1
+            self.notify("merge", keep=keep, duplicate=duplicate, previous_doctor=previous_doctor)
+            return keep, duplicate
+
+    def merged_patient_ids(self, patient_id):
+        # IDs of the duplicates merged into a patient, directly or through earlier merges
+        with self.lock.read_locked():
+            return list(self.merged_ids.get(patient_id, ()))
+
+    def get_doctor(self, doctor_id):
+        # Raises KeyError if there is no doctor with this ID
+        with self.lock.read_locked():
+            return self.doctors_by_id[doctor_id]
+
+    def get_patient(self, patient_id):
+        # Raises KeyError if there is no patient with this ID
+        with self.lock.read_locked():
+            return self.patients_by_id[patient_id]
+
+    def list_doctors(self):
+        with self.lock.read_locked():
+            return list(self.doctors)
+
+    def list_patients(self):
+        with self.lock.read_locked():
+            return list(self.patients)
+
+    def consultations_between(self, doctor_id, patient_id):
+        # Consultations this doctor has recorded for this patient, oldest first
+        # Costs O(result) whatever the size of the doctor's caseload
+        with self.lock.read_locked():
+            return list(self.consultations_by_pair.get((doctor_id, patient_id), ()))
+
+    def search_consultations(self, query):
+        # Consultations whose description matches a query (see textindex.py), oldest first
+        with self.lock.read_locked():
+            return [self.consultations_by_id[consultation_id] for consultation_id in self.descriptions.search(query)]
+
+    def _index_consultation(self, consultation):
+        # Caller holds the write lock
+        self.consultations_by_pair.setdefault((consultation.doctor_id, consultation.patient_id), []).append(consultation)
+
+    def _unindex_consultation(self, consultation):
+        # Caller holds the write lock
+        key = (consultation.doctor_id, consultation.patient_id)
+        items = self.consultations_by_pair[key]
+        remove_latest(items, consultation)
+        if not items:
+            del self.consultations_by_pair[key]
+
+    def assign_patient_to_doctor(self, patient_id, doctor_id):
+        # Link patient and doctor in one step, unlinking the patient from any previous doctor
+        # Returns the patient, the doctor and the previous doctor (or None)
+        with self.lock.write_locked():
+            patient = self.patients_by_id[patient_id]
+            doctor = self.doctors_by_id[doctor_id]
+            previous_doctor = patient.doctor
+            if previous_doctor is not doctor:
+                self._unlink(patient)
+                self._link(patient, doctor)
+                self.notify("assign", patient=patient, doctor=doctor, previous_doctor=previous_doctor)
+            return patient, doctor, previous_doctor
+
+    def unassign_patient(self, patient_id):
+        # Remove the patient's doctor link on both sides, returning the patient and the previous doctor
+        with self.lock.write_locked():
+            patient = self.patients_by_id[patient_id]
+            previous_doctor = self._unlink(patient)
+            if previous_doctor is not None:
+                self.notify("unassign", patient=patient, previous_doctor=previous_doctor)
+            return patient, previous_doctor
+
+    def add_consultation(self, patient_id, doctor_id, date, description, fee):
+        # Record one consultation on both the patient and the doctor in one step
+        # The fee is parsed into minor units here, once; invalid fees raise ValueError
+        return self.attach_consultation(patient_id, doctor_id, Consultation(date, description, parse_fee(fee)))
+
+    def add_consultations(self, submissions):
+        # Record a batch of (patient_id, doctor_id, date, description, fee) under one write lock
+        # Returns, per submission, the consultation or the KeyError/ValueError that rejected it
+        results = []
+        with self.lock.write_locked():
+            for patient_id, doctor_id, date, description, fee in submissions:
+                try:
+                    results.append(self._attach_consultation(patient_id, doctor_id, Consultation(date, description, parse_fee(fee)))[2])
+                except (KeyError, ValueError) as error:
+                    results.append(error)
+        return results
+
+    def attach_consultation(self, patient_id, doctor_id, consultation):
+        # Record an existing consultation object on both the patient and the doctor
+        with self.lock.write_locked():
+            return self._attach_consultation(patient_id, doctor_id, consultation)
+
+    def _attach_consultation(self, patient_id, doctor_id, consultation):
+        # Caller holds the write lock; nothing changes unless both IDs exist
+        patient = self.patients_by_id[patient_id]
+        doctor = self.doctors_by_id[doctor_id]
+        consultation.patient_id = patient_id
+        consultation.doctor_id = doctor_id
+        # A consultation put back by redo keeps the ID it was first given
+        if consultation.consultation_id is None:
+            consultation.consultation_id = self.next_consultation_id
+            self.next_consultation_id += 1
+        patient.add_consultation(consultation)
+        doctor.add_consultation(consultation)
+        self._index_consultation(consultation)
+        self.consultations_by_id[consultation.consultation_id] = consultation
+        self.descriptions.add(consultation.consultation_id, consultation.description)
+        self.stats.consultation_added(doctor, consultation)
+        self.notify("consult", patient=patient, doctor=doctor, consultation=consultation)
+        return patient, doctor, consultation
+
+    def remove_consultation(self, patient_id, doctor_id, consultation):
+        # Take a consultation back off both the patient and the doctor
+        with self.lock.write_locked():
+            patient = self.patients_by_id[patient_id]
+            doctor = self.doctors_by_id[doctor_id]
+            patient.remove_consultation(consultation)
+            doctor.remove_consultation(consultation)
+            self._unindex_consultation(consultation)
+            del self.consultations_by_id[consultation.consultation_id]
+            self.descriptions.remove(consultation.consultation_id, consultation.description)
+            self.stats.consultation_removed(doctor, consultation)
+            self.notify("remove_consultation", patient=patient, doctor=doctor, consultation=consultation)
+            return patient, doctor, consultation
+
+    def load_doctors_data(self, filename='Doctor.txt'):
+    # Load doctor data from a text file (Doctor.txt)
+        try:
+            with open(filename, 'r') as file:
+                for i, j in enumerate(file, start=1000):
+                    doctor_data = j.strip().split(",")
+                    doctor = Doctor(int(i), *doctor_data)
+                    self.add_doctor(doctor)
+        except FileNotFoundError:
+            print(f"{filename} file not found.")
+
+    def load_patients_data(self, filename='Patient.txt'):
+    # Load patient data from a text file (Patient.txt)
+        try:
+            with open(filename, 'r') as file:
+                for i, j in enumerate(file, start=2000):
+                    patient_data = j.strip().split(",")
+                    patient = Patient(int(i), *patient_data)
+                    self.add_patient(patient)
+        except FileNotFoundError:
+            print(f"{filename} file not found.")
+            return
+        duplicate_groups = self.duplicates.candidate_groups()
+        if duplicate_groups:
+            print(f"{len(duplicate_groups)} possible duplicate patients found in {filename}.")
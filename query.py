@@ -0,0 +1,81 @@
+# Filter and sort engine for the doctor and patient tables
+# Filters read the model's secondary indexes (specialisation -> doctors,
+# Doctor.patients, unassigned patients), so they only touch matching rows.
+# Sort orders are computed once per column and cached as rank tables until the
+# model reports a change that can affect them, so sorting a filtered result of
+# k rows is a sort of k small integers rather than a re-sort of the roster.
+
+DOCTOR_SORT_KEYS = {
+    "ID": lambda doctor: doctor.doctor_id,
+    "Name": lambda doctor: (f"{doctor.first_name} {doctor.last_name}".lower(), doctor.doctor_id),
+    "Specialization": lambda doctor: (doctor.specialisation.lower(), f"{doctor.first_name} {doctor.last_name}".lower(), doctor.doctor_id),
+}
+
+PATIENT_SORT_KEYS = {
+    "ID": lambda patient: patient.patient_id,
+    "Name": lambda patient: (f"{patient.first_name} {patient.last_name}".lower(), patient.patient_id),
+    # Unassigned patients sort after everyone who has a doctor
+    "Assigned Doctor": lambda patient: (patient.doctor is None, f"{patient.doctor.first_name} {patient.doctor.last_name}".lower() if patient.doctor else "", patient.patient_id),
+}
+
+UNASSIGNED = "unassigned"
+
+
+class RosterQuery:
+    def __init__(self, model):
+        self.model = model
+        self.sort_cache = {} # (table, column) -> (version, ordered list, rank by id)
+
+    def _version(self, table, column):
+        # Only the assigned-doctor order depends on assignments; everything else only on the roster
+        if table == "patients" and column == "Assigned Doctor":
+            return (self.model.roster_version, self.model.assignment_version)
+        return (self.model.roster_version,)
+
+    def _sorted(self, table, column):
+        # Caller holds the model's read lock
+        version = self._version(table, column)
+        cached = self.sort_cache.get((table, column))
+        if cached is None or cached[0] != version:
+            if table == "doctors":
+                ordered = sorted(self.model.doctors, key=DOCTOR_SORT_KEYS[column])
+                rank = {doctor.doctor_id: i for i, doctor in enumerate(ordered)}
+            else:
+                ordered = sorted(self.model.patients, key=PATIENT_SORT_KEYS[column])
+                rank = {patient.patient_id: i for i, patient in enumerate(ordered)}
+            cached = (version, ordered, rank)
+            self.sort_cache[(table, column)] = cached
+        return cached[1], cached[2]
+
+    def doctors(self, specialisation=None, sort_column="ID", descending=False):
+        # Doctors, optionally only one specialisation, in the requested order
+        with self.model.lock.read_locked():
+            ordered, rank = self._sorted("doctors", sort_column)
+            if specialisation is None:
+                result = list(ordered)
+            else:
+                matches = self.model.doctors_by_specialisation.get(specialisation, [])
+                result = sorted(matches, key=lambda doctor: rank[doctor.doctor_id])
+        if descending:
+            result.reverse()
+        return result
+
+    def patients(self, doctor_id=None, sort_column="ID", descending=False):
+        # Patients, optionally only those of one doctor (or UNASSIGNED), in the requested order
+        with self.model.lock.read_locked():
+            ordered, rank = self._sorted("patients", sort_column)
+            if doctor_id is None:
+                result = list(ordered)
+            else:
+                if doctor_id == UNASSIGNED:
+                    matches = self.model.unassigned_patients.values()
+                else:
+                    matches = self.model.doctors_by_id[doctor_id].patients
+                result = sorted(matches, key=lambda patient: rank[patient.patient_id])
+        if descending:
+            result.reverse()
+        return result
+
+    def specialisations(self):
+        with self.model.lock.read_locked():
+            return sorted(self.model.doctors_by_specialisation)
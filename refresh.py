@@ -0,0 +1,53 @@
+# Coalescing refresh scheduler for the GUI
+# Instead of repainting a table after every action, callers mark the table (or
+# some of its rows) dirty. All marks made before the event loop goes idle are
+# merged and each dirty table is repainted once from an after_idle callback.
+
+
+class RefreshScheduler:
+    def __init__(self, widget):
+        # widget is any tkinter widget; it is only used for after_idle scheduling
+        self.widget = widget
+        self.views = {}
+        self.dirty = {}
+        self.pending = None
+        self.requested = 0
+        self.repainted = 0
+
+    def register(self, name, refresh_all, refresh_rows=None):
+        # refresh_all() repaints the whole view; refresh_rows(keys) repaints only the given rows
+        self.views[name] = (refresh_all, refresh_rows)
+
+    def mark_dirty(self, name, keys=None):
+        # Mark a whole view dirty (keys=None) or just some of its rows
+        self.requested += 1
+        refresh_all, refresh_rows = self.views[name]
+        if keys is None or refresh_rows is None:
+            self.dirty[name] = None
+        elif name not in self.dirty:
+            self.dirty[name] = set(keys)
+        elif self.dirty[name] is not None:
+            self.dirty[name].update(keys)
+        if self.pending is None:
+            self.pending = self.widget.after_idle(self.flush)
+
+    def flush(self):
+        # Repaint every dirty view once; also safe to call directly to repaint immediately
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+            self.pending = None
+        dirty, self.dirty = self.dirty, {}
+        for name, keys in dirty.items():
+            refresh_all, refresh_rows = self.views[name]
+            if keys is None:
+                refresh_all()
+            else:
+                refresh_rows(keys)
+            self.repainted += 1
+
+    def eliminated(self):
+        # Number of requested refreshes that were merged into another repaint
+        return self.requested - self.repainted - len(self.dirty)
+
+    def summary(self):
+        return f"{self.requested} refreshes requested, {self.repainted} repaints, {self.eliminated()} eliminated"
@@ -0,0 +1,255 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from multiprocessing.connection import wait
+
+from model import MedicalCenterModel, format_fee
+
+# Multi-site deployment
+# Every clinic site runs in its own worker process with its own Doctor.txt and
+# Patient.txt. The router sends a query to all workers at once over multiprocessing
+# pipes and merges the replies as they arrive, so a cross-site query takes as long
+# as the slowest site rather than the sum of all of them.
+
+# Doctor and patient IDs are positional within each site's files, so every result
+# carries the name of the site it came from
+
+
+def doctor_record(site, doctor):
+    return {
+        "site": site,
+        "doctor_id": doctor.doctor_id,
+        "name": f"{doctor.first_name} {doctor.last_name}",
+        "specialisation": doctor.specialisation,
+    }
+
+
+def patient_record(site, patient):
+    return {
+        "site": site,
+        "patient_id": patient.patient_id,
+        "name": f"{patient.first_name} {patient.last_name}",
+        "doctor_id": patient.doctor.doctor_id if patient.doctor else None,
+    }
+
+
+class ShardHandler:
+    # Answers router requests against one site's model inside the worker process
+    def __init__(self, site, model):
+        self.site = site
+        self.model = model
+
+    def find_doctor(self, doctor_id):
+        doctor = self.model.doctors_by_id.get(doctor_id)
+        return [doctor_record(self.site, doctor)] if doctor else []
+
+    def find_patient(self, patient_id):
+        patient = self.model.patients_by_id.get(patient_id)
+        return [patient_record(self.site, patient)] if patient else []
+
+    def search(self, text):
+        text = text.strip().lower()
+        with self.model.lock.read_locked():
+            doctors = [doctor_record(self.site, doctor) for doctor in self.model.doctors if text in f"{doctor.first_name} {doctor.last_name}".lower()]
+            patients = [patient_record(self.site, patient) for patient in self.model.patients if text in f"{patient.first_name} {patient.last_name}".lower()]
+        return {"doctors": doctors, "patients": patients}
+
+    def revenue(self):
+        with self.model.lock.read_locked():
+            by_doctor = {doctor.doctor_id: self.model.stats.revenue_by_doctor[doctor.doctor_id] for doctor in self.model.doctors}
+        return {"site": self.site, "total": sum(by_doctor.values()), "by_doctor": by_doctor}
+
+    def assign_patient_to_doctor(self, patient_id, doctor_id):
+        patient, doctor, previous_doctor = self.model.assign_patient_to_doctor(patient_id, doctor_id)
+        return patient_record(self.site, patient)
+
+    def add_consultation(self, patient_id, doctor_id, date, description, fee):
+        self.model.add_consultation(patient_id, doctor_id, date, description, fee)
+        return True
+
+
+def shard_worker(site, directory, conn):
+    # Entry point of a site worker process: load the site's files, then serve requests until told to stop
+    model = MedicalCenterModel()
+    model.load_doctors_data(os.path.join(directory, "Doctor.txt"))
+    model.load_patients_data(os.path.join(directory, "Patient.txt"))
+    handler = ShardHandler(site, model)
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        request_id, operation, args = request
+        try:
+            conn.send((request_id, True, getattr(handler, operation)(*args)))
+        except Exception as error:
+            conn.send((request_id, False, f"{type(error).__name__}: {error}"))
+    conn.close()
+
+
+class ShardError(Exception):
+    pass
+
+
+class ShardRouter:
+    # Front-end that owns one worker process per site and merges their answers
+    def __init__(self, sites, timeout=10.0):
+        self.sites = dict(sites)
+        self.timeout = timeout
+        self.connections = {}
+        self.processes = {}
+        # Every request carries an ID so a late reply to one that timed out is recognised and dropped
+        self.request_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self):
+        for site, directory in self.sites.items():
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=shard_worker, args=(site, directory, child_conn), name=f"shard-{site}", daemon=True)
+            process.start()
+            child_conn.close()
+            self.connections[site] = parent_conn
+            self.processes[site] = process
+        return self
+
+    def stop(self):
+        for conn in self.connections.values():
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes.values():
+            process.join(self.timeout)
+            if process.is_alive():
+                process.terminate()
+        for conn in self.connections.values():
+            conn.close()
+        self.connections.clear()
+        self.processes.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def call(self, site, operation, *args):
+        # Send a request to a single site and wait for its answer
+        return self._gather({site: self.connections[site]}, operation, args)[site]
+
+    def fan_out(self, operation, *args):
+        # Send the request to every site first, then collect replies in whatever order they arrive
+        return self._gather(self.connections, operation, args)
+
+    def _gather(self, connections, operation, args):
+        with self._lock:
+            request_id = next(self.request_ids)
+            pending = {}
+            for site, conn in connections.items():
+                conn.send((request_id, operation, args))
+                pending[conn] = site
+
+            # Read every reply before reporting a failure so no answer is left in a pipe;
+            # replies to earlier requests that timed out are read and dropped
+            results = {}
+            errors = []
+            deadline = time.monotonic() + self.timeout
+            while pending:
+                ready = wait(list(pending), max(deadline - time.monotonic(), 0))
+                if not ready:
+                    raise ShardError(f"No reply from sites: {', '.join(sorted(pending.values()))}")
+                for conn in ready:
+                    reply_id, ok, value = conn.recv()
+                    if reply_id != request_id:
+                        continue
+                    site = pending.pop(conn)
+                    if ok:
+                        results[site] = value
+                    else:
+                        errors.append(f"Site {site}: {value}")
+            if errors:
+                raise ShardError("; ".join(errors))
+            return results
+
+    def find_doctor(self, doctor_id):
+        return self._merge_lists(self.fan_out("find_doctor", doctor_id))
+
+    def find_patient(self, patient_id):
+        return self._merge_lists(self.fan_out("find_patient", patient_id))
+
+    def search(self, text):
+        results = self.fan_out("search", text)
+        doctors = []
+        patients = []
+        for site in self.sites:
+            doctors.extend(results[site]["doctors"])
+            patients.extend(results[site]["patients"])
+        return {"doctors": doctors, "patients": patients}
+
+    def revenue(self):
+        results = self.fan_out("revenue")
+        by_site = {site: results[site]["total"] for site in self.sites}
+        return {"total": sum(by_site.values()), "by_site": by_site, "by_doctor": {site: results[site]["by_doctor"] for site in self.sites}}
+
+    def assign_patient_to_doctor(self, site, patient_id, doctor_id):
+        return self.call(site, "assign_patient_to_doctor", patient_id, doctor_id)
+
+    def add_consultation(self, site, patient_id, doctor_id, date, description, fee):
+        return self.call(site, "add_consultation", patient_id, doctor_id, date, description, fee)
+
+    def _merge_lists(self, results):
+        # Keep results in site order so output is stable however the replies arrived
+        return [record for site in self.sites for record in results[site]]
+
+
+def parse_site(value):
+    site, separator, directory = value.partition("=")
+    if not separator or not site or not directory:
+        raise argparse.ArgumentTypeError("expected NAME=DIRECTORY")
+    return site, directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query several clinic sites at once.")
+    parser.add_argument("--site", dest="sites", action="append", type=parse_site, required=True, help="Site as NAME=DIRECTORY holding Doctor.txt and Patient.txt (repeatable)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("doctor", help="Look up a doctor ID on every site").add_argument("doctor_id", type=int)
+    subparsers.add_parser("patient", help="Look up a patient ID on every site").add_argument("patient_id", type=int)
+    subparsers.add_parser("search", help="Search doctors and patients by name on every site").add_argument("text")
+    subparsers.add_parser("revenue", help="Total consultation fees per site")
+    args = parser.parse_args(argv)
+
+    for site, directory in args.sites:
+        if not os.path.isdir(directory):
+            parser.error(f"{directory} directory not found.")
+
+    with ShardRouter(args.sites) as router:
+        if args.command == "doctor":
+            for record in router.find_doctor(args.doctor_id):
+                print(f"[{record['site']}] {record['doctor_id']} {record['name']} ({record['specialisation']})")
+        elif args.command == "patient":
+            for record in router.find_patient(args.patient_id):
+                print(f"[{record['site']}] {record['patient_id']} {record['name']}")
+        elif args.command == "search":
+            results = router.search(args.text)
+            for record in results["doctors"]:
+                print(f"[{record['site']}] Doctor {record['doctor_id']} {record['name']} ({record['specialisation']})")
+            for record in results["patients"]:
+                print(f"[{record['site']}] Patient {record['patient_id']} {record['name']}")
+        elif args.command == "revenue":
+            results = router.revenue()
+            for site, total in results["by_site"].items():
+                print(f"{site}: {format_fee(total)}")
+            print(f"Total: {format_fee(results['total'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive import ConsultationArchive, archive_before, iter_full_consultation_report
+from model import Doctor, MedicalCenterModel, Patient
+from verify import audit
+
+
+class MergeArchivedTest(unittest.TestCase):
+    def test_merge_keeps_archived_history(self):
+        model = MedicalCenterModel()
+        model.add_doctor(Doctor(1000, "Ada", "Smith", "General Practitioner"))
+        for patient_id in (2000, 2001, 2002):
+            model.add_patient(Patient(patient_id, "Misha", "Patel"))
+            model.add_consultation(patient_id, 1000, "2020-01-01", f"old {patient_id}", "10")
+        model.add_consultation(2000, 1000, "2024-01-01", "recent", "10")
+        with tempfile.TemporaryDirectory() as directory:
+            archive = ConsultationArchive(directory)
+            archive_before(model, archive, (2021, 1))
+            # 2002 is merged into 2001 first, so 2000 inherits both through one merge
+            model.merge_patients(2001, 2002)
+            keep, _ = model.merge_patients(2000, 2001)
+
+            self.assertEqual(keep.archived_count, 3)
+            self.assertEqual(sorted(model.merged_patient_ids(2000)), [2001, 2002])
+            history = list(iter_full_consultation_report(keep, archive, model.merged_patient_ids(2000)))
+            self.assertEqual(len(history), 4)
+            self.assertEqual(audit(model), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
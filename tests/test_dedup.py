@@ -0,0 +1,61 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from itertools import islice
+
+from dedup import CANDIDATE_LIMIT, DuplicateIndex, iter_duplicate_report
+from model import Doctor, MedicalCenterModel, Patient
+
+
+class DuplicateIndexTest(unittest.TestCase):
+    def test_same_name_is_a_candidate(self):
+        index = DuplicateIndex()
+        index.add(Patient(2000, "Misha", "Patel"))
+        self.assertEqual(index.add(Patient(2001, "Misha", "Patel")), [2000])
+        self.assertEqual(index.candidate_groups(), [[2000, 2001]])
+
+    def test_removed_patient_leaves_its_buckets(self):
+        index = DuplicateIndex()
+        first = Patient(2000, "Misha", "Patel")
+        index.add(first)
+        index.add(Patient(2001, "Misha", "Patel"))
+        index.remove(first)
+        self.assertEqual(index.candidate_groups(), [])
+        self.assertEqual(index.add(Patient(2002, "Misha", "Patel")), [2001])
+
+    def test_large_same_key_bucket_loads_in_linear_time(self):
+        # Digits are dropped by normalize_name, so every one of these shares one bucket
+        model = MedicalCenterModel()
+        start = time.perf_counter()
+        for i in range(20000):
+            candidates = model.add_patient(Patient(i, f"Patient{i}", f"Surname{i}"))
+            self.assertLessEqual(len(candidates), 2 * CANDIDATE_LIMIT)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(model.duplicates.candidate_groups(), [list(range(20000))])
+        # Quadratic behaviour took tens of seconds for a tenth of this
+        self.assertLess(elapsed, 10)
+
+    def test_partly_read_report_does_not_block_writers(self):
+        # A paged window reads the first page and leaves the generator suspended
+        model = MedicalCenterModel()
+        model.add_doctor(Doctor(1000, "Ada", "Smith", "General Practitioner"))
+        # Surnames that differ in their first letter or sound, so every pair is its own group
+        surnames = [f"{first}o{last}".title() for first in "bcdfgjklmnpqrstvxz" for last in "bdlmr"]
+        for i, surname in enumerate(surnames[:60]):
+            model.add_patient(Patient(2000 + 2 * i, "Misha", surname))
+            model.add_patient(Patient(2001 + 2 * i, "Misha", surname))
+        report = iter_duplicate_report(model)
+        self.assertEqual(len(list(islice(report, 50))), 50)
+        writer = threading.Thread(target=model.assign_patient_to_doctor, args=(2000, 1000), daemon=True)
+        writer.start()
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive import ConsultationArchive, archive_before
+from changefeed import ChangeFeed
+from export import export_new_consultations
+from journal import ConsultCommand, Journal
+from model import Doctor, MedicalCenterModel, Patient
+
+
+class IncrementalExportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.feed_path = os.path.join(self.directory.name, "changes.jsonl")
+        self.checkpoint_path = os.path.join(self.directory.name, "billing.checkpoint")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def start_run(self):
+        # A fresh model, as every start of the GUI builds one, publishing to the same feed
+        model = MedicalCenterModel()
+        feed = ChangeFeed(model, self.feed_path)
+        model.add_doctor(Doctor(1000, "Ada", "Smith", "General Practitioner"))
+        model.add_patient(Patient(2000, "Misha", "Patel"))
+        self.addCleanup(feed.close)
+        return model
+
+    def export(self):
+        handle = io.StringIO()
+        export_new_consultations(self.feed_path, handle, self.checkpoint_path, "jsonl")
+        return [json.loads(line)["description"] for line in handle.getvalue().splitlines()]
+
+    def test_redone_and_archived_consultations_are_not_skipped(self):
+        model = self.start_run()
+        journal = Journal(model)
+        journal.execute(ConsultCommand(2000, 1000, "2020-01-01", "first", "10"))
+        self.assertEqual(self.export(), ["first"])
+
+        journal.execute(ConsultCommand(2000, 1000, "2020-02-01", "second", "20"))
+        journal.undo()
+        journal.redo()
+        archive_before(model, ConsultationArchive(os.path.join(self.directory.name, "archive")), (2021, 1))
+        self.assertEqual(self.export(), ["second"])
+        self.assertEqual(self.export(), [])
+
+    def test_restart_keeps_unexported_consultations(self):
+        model = self.start_run()
+        model.add_consultation(2000, 1000, "2024-01-01", "before restart", "10")
+        model = self.start_run()
+        model.add_consultation(2000, 1000, "2024-01-02", "after restart", "10")
+        self.assertEqual(self.export(), ["before restart", "after restart"])
+
+
+if __name__ == "__main__":
+    unittest.main()
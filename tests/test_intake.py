@@ -0,0 +1,27 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intake import parse_submission
+
+
+def submission(fee):
+    return f'{{"patient_id": 2000, "doctor_id": 1000, "date": "2024-05-02", "description": "Check-up", "fee": {fee}}}'
+
+
+class ParseSubmissionTest(unittest.TestCase):
+    def test_fee_is_an_amount_however_it_is_sent(self):
+        for fee in ('50', '"50"', '50.0', '"50.00"'):
+            self.assertEqual(parse_submission(submission(fee)).fields[4], 5000, fee)
+        self.assertEqual(parse_submission(submission('49.99')).fields[4], 4999)
+
+    def test_bad_fees_are_rejected(self):
+        for fee in ('true', 'false', 'null', '-1', '49.999', '"abc"', '[50]'):
+            with self.assertRaises(ValueError, msg=fee):
+                parse_submission(submission(fee))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sharding import ShardError, ShardRouter
+
+
+class ShardRouterTest(unittest.TestCase):
+    def test_late_reply_is_not_taken_for_the_next_answer(self):
+        # A stand-in worker that answers the first request only after the router gave up on it
+        router_conn, worker_conn = multiprocessing.Pipe()
+        router = ShardRouter({"north": None}, timeout=0.1)
+        router.connections["north"] = router_conn
+
+        def worker():
+            request_id, _, _ = worker_conn.recv()
+            time.sleep(0.3)
+            worker_conn.send((request_id, True, {"doctors": [], "patients": []}))
+            request_id, _, args = worker_conn.recv()
+            worker_conn.send((request_id, True, [{"site": "north", "doctor_id": args[0]}]))
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        with self.assertRaises(ShardError):
+            router.search("smith")
+        time.sleep(0.3)
+        self.assertEqual(router.find_doctor(1000), [{"site": "north", "doctor_id": 1000}])
+        thread.join(5)
+        router_conn.close()
+        worker_conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import Journal
+from model import Doctor, MedicalCenterModel, Patient
+from triage import TriageQueue, WaitingRoom
+
+
+def clinic(patient_count=6):
+    model = MedicalCenterModel()
+    model.add_doctor(Doctor(1000, "Ada", "Smith", "General Practitioner"))
+    model.add_doctor(Doctor(1001, "Ben", "Jones", "General Practitioner"))
+    for i in range(patient_count):
+        model.add_patient(Patient(2000 + i, f"Patient{i}", "Test"))
+        model.assign_patient_to_doctor(2000 + i, 1000)
+    return model
+
+
+class TriageQueueTest(unittest.TestCase):
+    def test_dead_entries_are_compacted(self):
+        queue = TriageQueue()
+        for patient_id in range(1000):
+            queue.push(patient_id, 4, patient_id, 0.0)
+        for patient_id in range(0, 1000, 2):
+            queue.discard(patient_id)
+        for _ in range(200):
+            queue.pop()
+        self.assertEqual(len(queue), 300)
+        self.assertLessEqual(len(queue.heap), 2 * len(queue) + 1)
+        self.assertEqual([entry[2] for entry in queue.waiting()][:3], [401, 403, 405])
+
+
+class WaitingRoomTest(unittest.TestCase):
+    def setUp(self):
+        self.model = clinic()
+        self.room = WaitingRoom(self.model)
+        self.journal = Journal(self.model)
+
+    def order(self, doctor_id):
+        return [patient_id for patient_id, _, _ in self.room.waiting(doctor_id)]
+
+    def test_bump_keeps_arrival_order_among_equals(self):
+        for patient_id in (2000, 2001, 2002):
+            self.room.enqueue(patient_id)
+        self.room.bump(2002, 1)
+        self.assertEqual(self.order(1000), [2002, 2000, 2001])
+        self.room.bump(2002, 4)
+        self.room.bump(2000, 4)
+        self.assertEqual(self.order(1000), [2000, 2001, 2002])
+
+    def test_reassignment_moves_the_queue_entry(self):
+        self.room.enqueue(2000, 2)
+        self.room.enqueue(2001)
+        self.model.assign_patient_to_doctor(2001, 1001)
+        self.assertEqual(self.order(1000), [2000])
+        self.assertEqual(self.room.waiting(1001)[0][:2], (2001, 4))
+
+    def test_specialisation_call_skips_busy_doctors(self):
+        self.room.enqueue(2000, 1)
+        self.room.enqueue(2001, 2, doctor_id=1001)
+        self.assertEqual(self.room.next_for_specialisation("General Practitioner"), (1000, 2000))
+        self.room.dequeue(1000, "2024-05-02", "Check-up", "50", self.journal)
+        self.assertTrue(self.room.is_busy(1000))
+        self.room.enqueue(2002, 1)
+        self.assertEqual(self.room.next_for_specialisation("General Practitioner"), (1001, 2001))
+        self.assertTrue(self.room.free(1000))
+        self.assertEqual(self.room.next_for_specialisation("General Practitioner"), (1000, 2002))
+
+    def test_undoing_a_call_puts_the_patient_back(self):
+        for patient_id in (2000, 2001):
+            self.room.enqueue(patient_id)
+        self.room.dequeue(1000, "2024-05-02", "Check-up", "50", self.journal)
+        self.assertEqual(self.order(1000), [2001])
+        self.journal.undo()
+        self.assertEqual(self.order(1000), [2000, 2001])
+        self.assertFalse(self.room.is_busy(1000))
+        self.assertEqual(self.model.get_patient(2000).consultations, [])
+        self.journal.redo()
+        self.assertEqual(self.order(1000), [2001])
+        self.assertTrue(self.room.is_busy(1000))
+        self.assertEqual(len(self.model.get_patient(2000).consultations), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import Doctor, MedicalCenterModel, Patient
+from verify import audit
+
+
+def one_doctor_model(patient_count):
+    model = MedicalCenterModel()
+    model.add_doctor(Doctor(1000, "Ada", "Smith", "General Practitioner"))
+    for i in range(patient_count):
+        model.add_patient(Patient(2000 + i, f"Patient{i}", "Test"))
+        model.assign_patient_to_doctor(2000 + i, 1000)
+    return model
+
+
+class AuditTest(unittest.TestCase):
+    def test_patient_listed_twice_is_reported(self):
+        model = one_doctor_model(3)
+        model.doctors[0].patients.append(model.patients[1])
+        messages = [violation.message for violation in audit(model)]
+        self.assertIn("Doctor 1000 lists patient 2001 2 times", messages)
+
+    def test_large_caseload_audits_in_linear_time(self):
+        model = one_doctor_model(20000)
+        start = time.perf_counter()
+        self.assertEqual(audit(model), [])
+        # Counting each patient by rescanning the caseload took several seconds here
+        self.assertLess(time.perf_counter() - start, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import bisect
+import re
+
+# Full-text index over consultation descriptions
+# Descriptions are split into lower-case words and every word keeps a posting list
+# of the IDs of the consultations that use it. IDs are handed out in increasing
+# order, so appending keeps each posting list sorted. A query only reads the
+# posting lists of its terms, so it costs time in proportion to those lists rather
+# than to the whole consultation history.
+#
+# Query syntax: words next to each other must all match (AND is implied and may be
+# written out), OR separates alternatives and binds more loosely than AND, and a
+# trailing * matches every word starting with that prefix:
+#
+#     asthma inhaler      asthma AND inhaler      asthma OR wheez*
+
+WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return WORD.findall(str(text).lower())
+
+
+def parse_query(query):
+    # Return a list of OR clauses, each a list of AND terms; a term is (word, is_prefix)
+    clauses = [[]]
+    for token in str(query).split():
+        if token == "OR":
+            clauses.append([])
+        elif token == "AND":
+            continue
+        else:
+            words = tokenize(token)
+            for word in words[:-1]:
+                clauses[-1].append((word, False))
+            if words:
+                clauses[-1].append((words[-1], token.endswith("*")))
+    return [clause for clause in clauses if clause]
+
+
+class ConsultationIndex:
+    def __init__(self):
+        self.postings = {} # word -> sorted consultation IDs
+        self.words = [] # every indexed word, sorted, for prefix lookups
+
+    def add(self, consultation_id, description):
+        for word in set(tokenize(description)):
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = []
+                bisect.insort(self.words, word)
+            if posting and posting[-1] > consultation_id:
+                bisect.insort(posting, consultation_id)
+            else:
+                posting.append(consultation_id)
+
+    def remove(self, consultation_id, description):
+        for word in set(tokenize(description)):
+            posting = self.postings.get(word)
+            if not posting:
+                continue
+            # Undo takes back the newest consultation, which is the last entry
+            if posting[-1] == consultation_id:
+                posting.pop()
+            else:
+                position = bisect.bisect_left(posting, consultation_id)
+                if position < len(posting) and posting[position] == consultation_id:
+                    del posting[position]
+            if not posting:
+                del self.postings[word]
+                del self.words[bisect.bisect_left(self.words, word)]
+
+    def _contains(self, word, consultation_id):
+        posting = self.postings.get(word, ())
+        position = bisect.bisect_left(posting, consultation_id)
+        return position < len(posting) and posting[position] == consultation_id
+
+    def _term_ids(self, word, prefix):
+        if not prefix:
+            return set(self.postings.get(word, ()))
+        ids = set()
+        position = bisect.bisect_left(self.words, word)
+        while position < len(self.words) and self.words[position].startswith(word):
+            ids.update(self.postings[self.words[position]])
+            position += 1
+        return ids
+
+    def search(self, query):
+        # Sorted IDs of the consultations matching the query
+        result = set()
+        for clause in parse_query(query):
+            # Intersect starting from the rarest exact term so the working set stays small
+            clause = sorted(clause, key=lambda term: len(self.postings.get(term[0], ())) if not term[1] else float("inf"))
+            matches = None
+            for word, prefix in clause:
+                if matches is None:
+                    matches = self._term_ids(word, prefix)
+                elif prefix:
+                    matches &= self._term_ids(word, prefix)
+                else:
+                    # Probe the other posting lists instead of copying them
+                    matches = {consultation_id for consultation_id in matches if self._contains(word, consultation_id)}
+                if not matches:
+                    break
+            result |= matches
+        return sorted(result)
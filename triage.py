@@ -0,0 +1,249 @@
+import heapq
+import itertools
+import threading
+import time
+
+from journal import ConsultCommand
+from model import parse_fee
+
+# Waiting-room triage
+# Every doctor has a waiting queue kept as a binary heap of (priority, arrival)
+# entries, so the next patient is the most urgent one and, among equally urgent
+# patients, the one who has waited longest. Priority 1 is the most urgent.
+#
+# Changing a patient's priority does not search the heap: the old entry is marked
+# as removed and a new one is pushed with the same arrival. Removed entries are
+# dropped when they reach the top, or all at once when they outnumber the live
+# ones. Enqueue, dequeue and priority changes are therefore O(log n) amortised.
+#
+# A doctor who has called a patient is busy until they are marked free, and a
+# call for a specialisation only goes to free doctors. Calls are made through the
+# undo journal; undoing one takes the consultation back, puts the patient back
+# in their old place and restores the doctor's busy state.
+
+PRIORITIES = {1: "Emergency", 2: "Urgent", 3: "Soon", 4: "Standard", 5: "Routine"}
+DEFAULT_PRIORITY = 4
+
+
+class TriageQueue:
+    # Waiting patients of one doctor
+    def __init__(self):
+        self.heap = [] # [priority, arrival, patient_id, arrived_at, waiting]
+        self.entries = {} # patient_id -> live heap entry
+        self.removed = 0 # dead entries still in the heap
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, patient_id):
+        return patient_id in self.entries
+
+    def push(self, patient_id, priority, arrival, arrived_at):
+        entry = [priority, arrival, patient_id, arrived_at, True]
+        self.entries[patient_id] = entry
+        heapq.heappush(self.heap, entry)
+
+    def discard(self, patient_id):
+        # Mark the patient's entry dead and return it, or None if they are not waiting
+        entry = self.entries.pop(patient_id, None)
+        if entry is not None:
+            entry[4] = False
+            self.removed += 1
+            self._compact()
+        return entry
+
+    def _compact(self):
+        # Rebuild once dead entries outnumber live ones, so the heap stays O(live)
+        if self.removed > len(self.entries):
+            self.heap = [entry for entry in self.heap if entry[4]]
+            heapq.heapify(self.heap)
+            self.removed = 0
+
+    def peek(self):
+        # The live entry at the top of the heap, dropping dead ones on the way; None if empty
+        while self.heap and not self.heap[0][4]:
+            heapq.heappop(self.heap)
+            self.removed -= 1
+        return self.heap[0] if self.heap else None
+
+    def pop(self):
+        entry = self.peek()
+        if entry is None:
+            return None
+        heapq.heappop(self.heap)
+        del self.entries[entry[2]]
+        self._compact()
+        return entry
+
+    def waiting(self):
+        # Live entries in the order they would be seen; O(n log n), meant for display
+        return sorted(self.entries.values())
+
+
+class CallCommand(ConsultCommand):
+    # The consultation of a patient called from a doctor's queue
+    name = "call_next"
+
+    def __init__(self, waiting_room, entry, doctor_id, date, description, fee):
+        super().__init__(entry[2], doctor_id, date, description, fee)
+        self.waiting_room = waiting_room
+        self.entry = entry # the patient's heap entry, so undo restores their priority and arrival
+        self.was_busy = False
+
+    def apply(self, model):
+        result = super().apply(model)
+        self.was_busy = self.waiting_room.called(self.patient_id, self.doctor_id)
+        return result
+
+    def undo(self, model):
+        super().undo(model)
+        self.waiting_room.requeue(self.entry, self.doctor_id, self.was_busy)
+
+    def describe(self):
+        return f"call patient {self.patient_id} to doctor {self.doctor_id}"
+
+
+class WaitingRoom:
+    # Triage queues for every doctor. It listens to the model so a patient who is
+    # reassigned keeps their place with their new doctor, and a merged duplicate
+    # leaves the queue.
+    def __init__(self, model):
+        self.model = model
+        self.queues = {} # doctor_id -> TriageQueue
+        self.doctor_of = {} # patient_id -> doctor_id whose queue they are in
+        self.busy = set() # doctor_ids seeing a called patient
+        self.arrivals = itertools.count()
+        # Never held while calling into the model, so it cannot deadlock with the model lock
+        self.lock = threading.Lock()
+        model.add_listener(self)
+
+    def queue(self, doctor_id):
+        return self.queues.setdefault(doctor_id, TriageQueue())
+
+    def enqueue(self, patient_id, priority=DEFAULT_PRIORITY, doctor_id=None):
+        # Put a patient in the queue of doctor_id, or of their assigned doctor
+        # Raises KeyError for unknown IDs and ValueError for a bad priority or no doctor
+        if priority not in PRIORITIES:
+            raise ValueError(f"Priority must be one of {sorted(PRIORITIES)}")
+        patient = self.model.get_patient(patient_id)
+        if doctor_id is None:
+            if patient.doctor is None:
+                raise ValueError(f"Patient {patient_id} has no assigned doctor")
+            doctor_id = patient.doctor.doctor_id
+        else:
+            self.model.get_doctor(doctor_id)
+        with self.lock:
+            # Someone already waiting keeps their arrival when they are queued again
+            previous = self._discard(patient_id)
+            arrival, arrived_at = (previous[1], previous[3]) if previous else (next(self.arrivals), time.time())
+            self.queue(doctor_id).push(patient_id, priority, arrival, arrived_at)
+            self.doctor_of[patient_id] = doctor_id
+        return doctor_id
+
+    def bump(self, patient_id, priority):
+        # Change a waiting patient's priority without losing their place among equals
+        if priority not in PRIORITIES:
+            raise ValueError(f"Priority must be one of {sorted(PRIORITIES)}")
+        with self.lock:
+            doctor_id = self.doctor_of[patient_id]
+            entry = self.queues[doctor_id].discard(patient_id)
+            self.queues[doctor_id].push(patient_id, priority, entry[1], entry[3])
+        return doctor_id
+
+    def remove(self, patient_id):
+        with self.lock:
+            return self._discard(patient_id) is not None
+
+    def _discard(self, patient_id):
+        # Caller holds self.lock
+        doctor_id = self.doctor_of.pop(patient_id, None)
+        return self.queues[doctor_id].discard(patient_id) if doctor_id is not None else None
+
+    def next_for_specialisation(self, specialisation, busy=None):
+        # The doctor and patient to call next across every doctor of a specialisation
+        # who is not busy (the waiting room's own busy doctors unless given), or None;
+        # reads the model's specialisation index
+        with self.model.lock.read_locked():
+            doctors = list(self.model.doctors_by_specialisation.get(specialisation, ()))
+        best = None
+        with self.lock:
+            if busy is None:
+                busy = self.busy
+            for doctor in doctors:
+                if doctor.doctor_id in busy or doctor.doctor_id not in self.queues:
+                    continue
+                entry = self.queues[doctor.doctor_id].peek()
+                if entry is not None and (best is None or entry[:2] < best[1][:2]):
+                    best = (doctor.doctor_id, entry)
+        return (best[0], best[1][2]) if best else None
+
+    def dequeue(self, doctor_id, date, description, fee, journal):
+        # Call the next patient for a doctor and record their consultation through the
+        # journal, so it can be undone like any other; the doctor becomes busy
+        # Returns (patient, doctor, command), or None if nobody is waiting
+        fee = parse_fee(fee)
+        self.model.get_doctor(doctor_id)
+        with self.lock:
+            entry = self.queues[doctor_id].pop() if doctor_id in self.queues else None
+            if entry is None:
+                return None
+            del self.doctor_of[entry[2]]
+        command = CallCommand(self, entry, doctor_id, date, description, fee)
+        try:
+            patient, doctor = journal.execute(command)
+        except (KeyError, ValueError):
+            self.requeue(entry, doctor_id, doctor_id in self.busy)
+            raise
+        return patient, doctor, command
+
+    def called(self, patient_id, doctor_id):
+        # Take a called patient out of any queue and mark the doctor busy; returns whether they already were
+        with self.lock:
+            self._discard(patient_id)
+            was_busy = doctor_id in self.busy
+            self.busy.add(doctor_id)
+        return was_busy
+
+    def requeue(self, entry, doctor_id, busy):
+        # Put a called patient back in their old place and restore the doctor's busy state
+        priority, arrival, patient_id, arrived_at, _ = entry
+        with self.lock:
+            self._discard(patient_id)
+            self.queue(doctor_id).push(patient_id, priority, arrival, arrived_at)
+            self.doctor_of[patient_id] = doctor_id
+            if busy:
+                self.busy.add(doctor_id)
+            else:
+                self.busy.discard(doctor_id)
+
+    def free(self, doctor_id):
+        # The doctor has finished with their patient; returns False if they were not busy
+        self.model.get_doctor(doctor_id)
+        with self.lock:
+            if doctor_id not in self.busy:
+                return False
+            self.busy.discard(doctor_id)
+            return True
+
+    def is_busy(self, doctor_id):
+        with self.lock:
+            return doctor_id in self.busy
+
+    def waiting(self, doctor_id):
+        # (patient_id, priority, arrived_at) in calling order
+        with self.lock:
+            queue = self.queues.get(doctor_id)
+            return [(entry[2], entry[0], entry[3]) for entry in queue.waiting()] if queue else []
+
+    def __call__(self, event, details):
+        # Model listener; runs with the model's write lock held
+        if event == "assign" and details["previous_doctor"] is not None:
+            patient_id = details["patient"].patient_id
+            with self.lock:
+                if self.doctor_of.get(patient_id) == details["previous_doctor"].doctor_id:
+                    entry = self._discard(patient_id)
+                    self.queue(details["doctor"].doctor_id).push(patient_id, entry[0], entry[1], entry[3])
+                    self.doctor_of[patient_id] = details["doctor"].doctor_id
+        elif event == "merge":
+            with self.lock:
+                self._discard(details["duplicate"].patient_id)
@@ -0,0 +1,178 @@
+import argparse
+import sys
+from collections import Counter, deque
+
+# Invariant verifier for the model
+# audit() walks the whole model once (O(n)) and is meant for CI or an occasional
+# check. IncrementalVerifier listens to model changes and re-checks only the
+# patients and doctors a change touched, which is cheap enough to leave on.
+# Every violation carries a suggested repair.
+
+
+class Violation:
+    def __init__(self, kind, message, repair):
+        self.kind = kind
+        self.message = message
+        self.repair = repair
+
+    def __str__(self):
+        return f"[{self.kind}] {self.message} -> {self.repair}"
+
+
+def check_patient_link(model, patient, listed=None):
+    # The patient's doctor must exist and list the patient exactly once
+    # listed is how often the doctor lists the patient; it is counted here if not given
+    violations = []
+    doctor = patient.doctor
+    if doctor is None:
+        if patient.patient_id not in model.unassigned_patients:
+            violations.append(Violation("index", f"Patient {patient.patient_id} has no doctor but is missing from the unassigned index", f"add patient {patient.patient_id} to the unassigned index"))
+        return violations
+    if model.doctors_by_id.get(doctor.doctor_id) is not doctor:
+        violations.append(Violation("link", f"Patient {patient.patient_id} is assigned to unknown doctor {doctor.doctor_id}", f"unassign patient {patient.patient_id}"))
+    if listed is None:
+        listed = sum(1 for other in doctor.patients if other is patient)
+    if listed != 1:
+        violations.append(Violation("link", f"Doctor {doctor.doctor_id} lists patient {patient.patient_id} {listed} times", f"make doctor {doctor.doctor_id} list patient {patient.patient_id} exactly once"))
+    if patient.patient_id in model.unassigned_patients:
+        violations.append(Violation("index", f"Patient {patient.patient_id} has a doctor but is in the unassigned index", f"remove patient {patient.patient_id} from the unassigned index"))
+    return violations
+
+
+def check_doctor_patients(model, doctor):
+    # Everyone on the doctor's list must point back at the doctor, once, and the counter must agree
+    violations = []
+    seen = set()
+    for patient in doctor.patients:
+        if patient.doctor is not doctor:
+            current = patient.doctor.doctor_id if patient.doctor else "no doctor"
+            violations.append(Violation("link", f"Doctor {doctor.doctor_id} lists patient {patient.patient_id}, who is assigned to {current}", f"remove patient {patient.patient_id} from doctor {doctor.doctor_id}'s patient list"))
+        if id(patient) in seen:
+            violations.append(Violation("link", f"Doctor {doctor.doctor_id} lists patient {patient.patient_id} more than once", f"remove the duplicate entry from doctor {doctor.doctor_id}'s patient list"))
+        seen.add(id(patient))
+    counted = model.stats.patients_by_doctor[doctor.doctor_id]
+    if counted != len(doctor.patients):
+        violations.append(Violation("aggregate", f"Workload counter says doctor {doctor.doctor_id} has {counted} patients but the list has {len(doctor.patients)}", f"set the counter for doctor {doctor.doctor_id} to {len(doctor.patients)}"))
+    return violations
+
+
+def check_fee_total(entity, label, entity_id):
+    # Totals are lifetime figures, so they can only be checked before anything is archived
+    if entity.archived_count:
+        return []
+    total = sum(consultation.fee for consultation in entity.consultations)
+    if total != entity.total_fees:
+        return [Violation("aggregate", f"{label} {entity_id} fee total is {entity.total_fees} but consultations add up to {total}", f"set the fee total of {label.lower()} {entity_id} to {total}")]
+    return []
+
+
+def audit(model):
+    # Full check of every invariant; returns a list of violations
+    violations = []
+    with model.lock.read_locked():
+        if len(model.patients_by_id) != len(model.patients) or any(model.patients_by_id.get(patient.patient_id) is not patient for patient in model.patients):
+            violations.append(Violation("index", "Patient ID index does not match the patient list", "rebuild patients_by_id from the patient list"))
+        if len(model.doctors_by_id) != len(model.doctors) or any(model.doctors_by_id.get(doctor.doctor_id) is not doctor for doctor in model.doctors):
+            violations.append(Violation("index", "Doctor ID index does not match the doctor list", "rebuild doctors_by_id from the doctor list"))
+
+        # Count every doctor's list once, so checking each patient against it stays O(n)
+        listings = {id(doctor): Counter(id(patient) for patient in doctor.patients) for doctor in model.doctors}
+        for patient in model.patients:
+            listed = listings[id(patient.doctor)][id(patient)] if id(patient.doctor) in listings else None
+            violations.extend(check_patient_link(model, patient, listed))
+            violations.extend(check_fee_total(patient, "Patient", patient.patient_id))
+        for doctor in model.doctors:
+            violations.extend(check_doctor_patients(model, doctor))
+            violations.extend(check_fee_total(doctor, "Doctor", doctor.doctor_id))
+
+        # Every consultation is shared by exactly one patient and one doctor
+        doctor_count = {}
+        for doctor in model.doctors:
+            for consultation in doctor.consultations:
+                doctor_count[id(consultation)] = doctor_count.get(id(consultation), 0) + 1
+        for patient in model.patients:
+            for consultation in patient.consultations:
+                count = doctor_count.pop(id(consultation), 0)
+                if count != 1:
+                    violations.append(Violation("consultation", f"Consultation '{consultation}' of patient {patient.patient_id} is on {count} doctors' records", "record it on exactly one doctor"))
+                if consultation.patient_id != patient.patient_id:
+                    violations.append(Violation("consultation", f"Consultation '{consultation}' of patient {patient.patient_id} names patient {consultation.patient_id}", f"set its patient ID to {patient.patient_id}"))
+        if doctor_count:
+            violations.append(Violation("consultation", f"{len(doctor_count)} doctor consultations belong to no patient", "remove them from the doctors' records or attach them to a patient"))
+
+        # The doctor/patient history index holds exactly the consultations in memory
+        for doctor in model.doctors:
+            for consultation in doctor.consultations:
+                if consultation.doctor_id != doctor.doctor_id:
+                    violations.append(Violation("consultation", f"Consultation '{consultation}' of doctor {doctor.doctor_id} names doctor {consultation.doctor_id}", f"set its doctor ID to {doctor.doctor_id}"))
+        indexed = sum(len(consultations) for consultations in model.consultations_by_pair.values())
+        recorded = sum(len(doctor.consultations) for doctor in model.doctors)
+        stale = [key for key, consultations in model.consultations_by_pair.items() if any((consultation.doctor_id, consultation.patient_id) != key for consultation in consultations)]
+        if indexed != recorded or stale:
+            violations.append(Violation("index", f"Doctor/patient history index holds {indexed} consultations ({len(stale)} misfiled) but doctors hold {recorded}", "rebuild consultations_by_pair from the doctors' consultations"))
+        if len(model.consultations_by_id) != recorded:
+            violations.append(Violation("index", f"Consultation ID index holds {len(model.consultations_by_id)} consultations but doctors hold {recorded}", "rebuild consultations_by_id and the description index from the doctors' consultations"))
+    return violations
+
+
+class IncrementalVerifier:
+    # Checks only the entities named by each model change
+    def __init__(self, model, on_violation=None, keep=100):
+        self.model = model
+        self.on_violation = on_violation
+        self.violations = deque(maxlen=keep)
+        self.checks = 0
+        model.add_listener(self)
+
+    def close(self):
+        self.model.remove_listener(self)
+
+    def __call__(self, event, details):
+        # Called by the model with the write lock held
+        self.checks += 1
+        found = []
+        # Consultation events never change who is assigned to whom, so the links are not rechecked
+        if event not in ("consult", "remove_consultation"):
+            for key in ("patient", "keep"):
+                if key in details:
+                    found.extend(check_patient_link(self.model, details[key]))
+            for key in ("doctor", "previous_doctor"):
+                if details.get(key) is not None:
+                    found.extend(check_doctor_patients(self.model, details[key]))
+        # A reassigned patient still on the previous doctor's list is caught by check_doctor_patients
+        if event == "consult" and details["patient"].doctor is not details["doctor"]:
+            patient = details["patient"]
+            doctor = details["doctor"]
+            found.append(Violation("consultation", f"Consultation for patient {patient.patient_id} was recorded with doctor {doctor.doctor_id}, who is not their assigned doctor", f"assign patient {patient.patient_id} to doctor {doctor.doctor_id} or record the consultation with their own doctor"))
+        for violation in found:
+            self.violations.append(violation)
+            if self.on_violation:
+                self.on_violation(violation)
+
+    def take(self):
+        # Return and forget the violations collected so far
+        violations = list(self.violations)
+        self.violations.clear()
+        return violations
+
+
+def main(argv=None):
+    from model import MedicalCenterModel
+
+    parser = argparse.ArgumentParser(description="Check the clinic data for broken links and stale aggregates.")
+    parser.add_argument("--doctors", default="Doctor.txt", help="Doctor data file (default: Doctor.txt)")
+    parser.add_argument("--patients", default="Patient.txt", help="Patient data file (default: Patient.txt)")
+    args = parser.parse_args(argv)
+
+    model = MedicalCenterModel()
+    model.load_doctors_data(args.doctors)
+    model.load_patients_data(args.patients)
+    violations = audit(model)
+    for violation in violations:
+        print(violation)
+    print(f"{len(violations)} violations found.")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
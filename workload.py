@@ -0,0 +1,212 @@
+import argparse
+import json
+import math
+import sys
+import time
+
+from archive import ARCHIVE_DIRECTORY, ConsultationArchive, iter_full_consultation_report
+from journal import AssignCommand, ConsultCommand, Journal
+from model import parse_fee
+from triage import WaitingRoom
+
+# Workload recording and headless replay
+# The GUI can log every action the staff take (assign, consult, searches, the
+# information views, undo, redo, merges and the waiting room) with the time since the session started and
+# the fields exactly as they were typed, one compact JSON array per line:
+#
+#     [12.407,"assign","2003","1001"]
+#
+# The replayer feeds a recorded session to a model without any window, either at
+# the recorded pace or as fast as possible, and reports latency percentiles per
+# action, so a slow session from the front desk can become a regression benchmark.
+
+
+class WorkloadRecorder:
+    def __init__(self, path, clock=time.monotonic):
+        # Line buffered so everything up to a crash is on disk
+        self.file = open(path, "w", encoding="utf-8", buffering=1)
+        self.clock = clock
+        self.start = clock()
+
+    def record(self, action, *args):
+        line = [round(self.clock() - self.start, 3), action, *args]
+        self.file.write(json.dumps(line, separators=(",", ":")))
+        self.file.write("\n")
+
+    def close(self):
+        self.file.close()
+
+
+def iter_events(path):
+    # Yield (offset, action, args) for every recorded line
+    with open(path, encoding="utf-8") as session:
+        for line in session:
+            if line.strip():
+                offset, action, *args = json.loads(line)
+                yield offset, action, args
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(len(sorted_values) * fraction))
+    return sorted_values[rank - 1]
+
+
+class WorkloadReplayer:
+    # Applies recorded actions to a model the same way the GUI does, including
+    # its parsing of the typed fields, and times each one
+    ACTIONS = ("assign", "consult", "search", "search_consultations", "view_doctor", "view_patient", "view_report", "view_history", "view_history_with", "undo", "redo", "merge", "enqueue", "bump", "call_next", "free_doctor")
+
+    def __init__(self, model, archive=None):
+        self.model = model
+        # Full histories are read from this archive, as the GUI reads its own
+        self.archive = archive or ConsultationArchive()
+        self.journal = Journal(model)
+        self.waiting_room = WaitingRoom(model)
+        self.latencies = {} # action -> seconds per call
+        self.errors = {} # action -> calls that ended in "not found" or a bad field
+        self.skipped = {} # actions this replayer does not know
+
+    def assign(self, patient_id, doctor_id):
+        self.journal.execute(AssignCommand(int(patient_id), int(doctor_id)))
+
+    def consult(self, patient_id, doctor_id, date, description, fee):
+        fee = parse_fee(fee)
+        self.journal.execute(ConsultCommand(int(patient_id), int(doctor_id), date, description, fee))
+
+    def search(self, text):
+        text = text.strip().lower()
+        if not text:
+            return
+        matching_doctors = [doctor for doctor in self.model.list_doctors() if text in f"{doctor.first_name} {doctor.last_name}".lower()]
+        matching_patients = [patient for patient in self.model.list_patients() if text in f"{patient.first_name} {patient.last_name}".lower()]
+        return matching_doctors, matching_patients
+
+    def search_consultations(self, query):
+        if query.strip():
+            return self.model.search_consultations(query)
+
+    def view_doctor(self, doctor_id):
+        doctor = self.model.get_doctor(int(doctor_id))
+        with self.model.lock.read_locked():
+            return doctor.get_info()
+
+    def view_patient(self, patient_id):
+        patient = self.model.get_patient(int(patient_id))
+        with self.model.lock.read_locked():
+            return patient.get_info()
+
+    def view_report(self, patient_id):
+        patient = self.model.get_patient(int(patient_id))
+        with self.model.lock.read_locked():
+            return patient.get_consultation_report()
+
+    def view_history(self, patient_id):
+        patient = self.model.get_patient(int(patient_id))
+        return "".join(iter_full_consultation_report(patient, self.archive, self.model.merged_patient_ids(patient.patient_id)))
+
+    def view_history_with(self, patient_id, doctor_id):
+        patient = self.model.get_patient(int(patient_id))
+        doctor = self.model.get_doctor(int(doctor_id))
+        return "".join(f"{consultation}\n" for consultation in self.model.consultations_between(doctor.doctor_id, patient.patient_id))
+
+    def undo(self):
+        self.journal.undo()
+
+    def redo(self):
+        self.journal.redo()
+
+    def merge(self, keep_id, duplicate_id):
+        self.model.merge_patients(int(keep_id), int(duplicate_id))
+        self.journal.clear()
+
+    def enqueue(self, patient_id, priority, doctor_id):
+        doctor_id = doctor_id.strip()
+        self.waiting_room.enqueue(int(patient_id), int(priority.split()[0]), int(doctor_id) if doctor_id else None)
+
+    def bump(self, patient_id, priority):
+        self.waiting_room.bump(int(patient_id), int(priority.split()[0]))
+
+    def call_next(self, doctor_id, date, description, fee):
+        self.waiting_room.dequeue(int(doctor_id), date, description, fee, self.journal)
+
+    def free_doctor(self, doctor_id):
+        self.waiting_room.free(int(doctor_id))
+
+    def replay(self, events, speed=None):
+        # speed=None replays flat out; otherwise 1.0 is the recorded pace, 2.0 twice as fast
+        start = time.monotonic()
+        for offset, action, args in events:
+            if action not in self.ACTIONS:
+                self.skipped[action] = self.skipped.get(action, 0) + 1
+                continue
+            if speed:
+                delay = offset / speed - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            handler = getattr(self, action)
+            began = time.perf_counter()
+            try:
+                handler(*args)
+            except (KeyError, ValueError):
+                self.errors[action] = self.errors.get(action, 0) + 1
+            self.latencies.setdefault(action, []).append(time.perf_counter() - began)
+
+    def summary(self):
+        # One row per action: count, errors and p50/p90/p99/max latency in milliseconds
+        rows = []
+        for action in sorted(self.latencies):
+            values = sorted(self.latencies[action])
+            rows.append({
+                "action": action,
+                "count": len(values),
+                "errors": self.errors.get(action, 0),
+                "p50": percentile(values, 0.50) * 1000,
+                "p90": percentile(values, 0.90) * 1000,
+                "p99": percentile(values, 0.99) * 1000,
+                "max": values[-1] * 1000,
+            })
+        return rows
+
+
+def main(argv=None):
+    from model import MedicalCenterModel
+
+    parser = argparse.ArgumentParser(description="Replay a recorded GUI session against the model and report per-action latency.")
+    parser.add_argument("session", help="Session file written by main.py --record")
+    parser.add_argument("--doctors", default="Doctor.txt", help="Doctor data file (default: Doctor.txt)")
+    parser.add_argument("--patients", default="Patient.txt", help="Patient data file (default: Patient.txt)")
+    parser.add_argument("--archive", default=ARCHIVE_DIRECTORY, help=f"Consultation archive read by full-history views (default: {ARCHIVE_DIRECTORY})")
+    parser.add_argument("--speed", type=float, default=None, help="Replay at this multiple of the recorded pace (default: as fast as possible)")
+    parser.add_argument("--max-p99", type=float, default=None, metavar="MS", help="Exit with status 1 if any action's p99 latency is above MS milliseconds")
+    args = parser.parse_args(argv)
+
+    model = MedicalCenterModel()
+    model.load_doctors_data(args.doctors)
+    model.load_patients_data(args.patients)
+
+    replayer = WorkloadReplayer(model, ConsultationArchive(args.archive))
+    start = time.perf_counter()
+    replayer.replay(iter_events(args.session), speed=args.speed)
+    elapsed = time.perf_counter() - start
+
+    rows = replayer.summary()
+    print(f"{'action':<14}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for row in rows:
+        print(f"{row['action']:<14}{row['count']:>8}{row['errors']:>8}{row['p50']:>10.3f}{row['p90']:>10.3f}{row['p99']:>10.3f}{row['max']:>10.3f}")
+    for action, count in sorted(replayer.skipped.items()):
+        print(f"skipped {count} '{action}' actions")
+    print(f"replayed in {elapsed:.2f}s")
+
+    if args.max_p99 is not None:
+        slow = [row["action"] for row in rows if row["p99"] > args.max_p99]
+        if slow:
+            print(f"p99 above {args.max_p99} ms: {', '.join(slow)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())